@@ -3,14 +3,32 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import timedelta
+import math
+import time
+from collections import deque
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform, CONF_HOST, CONF_NAME, CONF_PORT
-from homeassistant.core import CoreState, HomeAssistant
+from homeassistant.const import (
+    Platform,
+    CONF_HOST,
+    CONF_NAME,
+    CONF_PORT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.core import CoreState, Event, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.event import async_track_time_interval, async_track_time_change
+from homeassistant.helpers.event import (
+    async_track_state_change_event,
+    async_track_time_change,
+    async_track_time_interval,
+)
 from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 
 from pymodbus.exceptions import ConnectionException
 
@@ -21,6 +39,7 @@ from .const import (
     CONF_SOLAR_FORECAST_SENSOR,
     CONF_MAX_CONTRACTED_POWER,
     DEFAULT_BASE_CONSUMPTION_KWH,
+    CONSUMPTION_HISTORY_SAVE_DELAY,
     SOC_REEVALUATION_THRESHOLD,
     CONF_ENABLE_WEEKLY_FULL_CHARGE,
     CONF_WEEKLY_FULL_CHARGE_DAY,
@@ -35,12 +54,64 @@ from .const import (
     DEFAULT_PD_DEADBAND,
     DEFAULT_PD_MAX_POWER_CHANGE,
     DEFAULT_PD_DIRECTION_HYSTERESIS,
+    SENSOR_FILTER_SIZE,
+    CONTROL_INTERVAL,
+    PD_TUNING_INTERVAL,
 )
 from .coordinator import MarstekVenusDataUpdateCoordinator
 from .calculated_sensors import async_setup_entry as async_setup_calculated_sensors
 
 _LOGGER = logging.getLogger(__name__)
 
+# Weekday keys as stored in config entries, indexed by datetime.weekday()
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# Bit for each weekday key in a time slot days mask (Mon = bit 0)
+_WEEKDAY_BITS = {day: 1 << i for i, day in enumerate(_WEEKDAYS)}
+# Entity states that carry no usable numeric value
+_INVALID_STATES = frozenset({STATE_UNKNOWN, STATE_UNAVAILABLE})
+# Pre-evaluation runs this long before the charging slot starts, within ± the tolerance
+_PRE_EVAL_LEAD_SECONDS = 60 * 60
+_PRE_EVAL_TOLERANCE_SECONDS = 5 * 60
+# Recompute the moving average's running sum exactly this often to shed rounding drift
+_SENSOR_SUM_RESYNC_SAMPLES = 100
+# While idle, an acknowledged all-zero command is re-sent only this often
+_IDLE_REASSERT_SECONDS = 60
+# Power feedback fields compared against the written command
+_ACK_FIELDS = itemgetter("force_mode", "set_charge_power", "set_discharge_power")
+# Energy balance fields used by the predictive charging notification
+_DECISION_FIELDS = itemgetter(
+    "should_charge",
+    "solar_forecast_kwh",
+    "stored_energy_kwh",
+    "usable_energy_kwh",
+    "min_reserve_kwh",
+    "effective_min_soc",
+    "avg_soc",
+    "avg_consumption_kwh",
+    "total_available_kwh",
+    "energy_deficit_kwh",
+    "days_in_history",
+    "reason",
+)
+
+
+def _format_seconds(seconds: int) -> str:
+    """Format seconds since midnight as HH:MM:SS."""
+    return "%02d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def _numeric_states(states):
+    """Yield the float value of every state that holds a valid number."""
+    for state in states:
+        raw = state.state
+        if raw in _INVALID_STATES:
+            continue
+        try:
+            yield float(raw)
+        except (ValueError, TypeError):
+            continue
+
+
 # List of platforms to support.
 PLATFORMS: list[Platform] = [
     Platform.SENSOR,
@@ -55,11 +126,40 @@ PLATFORMS: list[Platform] = [
 class ChargeDischargeController:
     """Controller to manage charge/discharge logic for all batteries."""
 
+    # Every attribute is created in __init__ (or set by the platform entities), so the
+    # controller doesn't need a per-instance __dict__
+    __slots__ = (
+        "hass", "coordinators", "consumption_sensor", "_consumption_state",
+        "_consumption_value", "config_entry", "previous_sensor", "previous_power",
+        "first_execution", "deadband", "kp", "kd", "max_power_change_per_cycle",
+        "direction_hysteresis", "_dbg", "_slots_cache", "_slots_cache_key",
+        "_slots_restrict_charge", "_slot_decision_memo", "_excluded_devices",
+        "_excluded_device_values", "sensor_history_size", "sensor_history", "_sensor_sum",
+        "_sensor_sum_updates", "_inv_sensor_history_size", "ki", "error_integral",
+        "previous_error", "dt", "_cycle_dt", "_last_tick", "integral_decay", "back_calculation_gain",
+        "sign_changes", "last_error_sign", "oscillation_threshold", "last_output_sign",
+        "predictive_charging_enabled", "solar_forecast_sensor", "max_contracted_power",
+        "grid_charging_active", "last_evaluation_soc", "predictive_charging_overridden",
+        "_grid_charging_initialized", "_allocated_batteries", "_idle_confirmed_at", "_last_decision_data",
+        "_pre_evaluated", "_pre_eval_decision_data", "_pre_eval_soc",
+        "_daily_consumption_history", "_history_sum", "_history_real_dates",
+        "_consumption_store", "manual_mode_enabled", "weekly_full_charge_enabled",
+        "weekly_full_charge_day", "_target_weekday", "weekly_full_charge_complete",
+        "last_checked_weekday", "weekly_full_charge_registers_written", "_pending_save_task",
+        "_store", "charging_time_slot", "_charging_slot_days", "_charging_slot_start",
+        "_charging_slot_end", "max_charge_capacity", "max_discharge_capacity",
+        "_capacity_limit",
+    )
+
     def __init__(self, hass: HomeAssistant, coordinators: list[MarstekVenusDataUpdateCoordinator], consumption_sensor: str, config_entry: ConfigEntry):
         """Initialize the controller."""
         self.hass = hass
         self.coordinators = coordinators
         self.consumption_sensor = consumption_sensor
+        # Latest consumption sensor state (pushed by a state change listener) and its
+        # value parsed once per state change (None if not numeric)
+        self._consumption_state = None
+        self._consumption_value = None
         self.config_entry = config_entry
         
         # State tracking
@@ -71,19 +171,49 @@ class ChargeDischargeController:
         self.deadband = config_entry.data.get(CONF_PD_DEADBAND, DEFAULT_PD_DEADBAND)
         self.kp = config_entry.data.get(CONF_PD_KP, DEFAULT_PD_KP)
         self.kd = config_entry.data.get(CONF_PD_KD, DEFAULT_PD_KD)
-        self.max_power_change_per_cycle = config_entry.data.get(CONF_PD_MAX_POWER_CHANGE, DEFAULT_PD_MAX_POWER_CHANGE)
+        # The option is a ramp per PD_TUNING_INTERVAL; scale it to the actual cycle length
+        self.max_power_change_per_cycle = (
+            config_entry.data.get(CONF_PD_MAX_POWER_CHANGE, DEFAULT_PD_MAX_POWER_CHANGE)
+            * CONTROL_INTERVAL / PD_TUNING_INTERVAL
+        )
         self.direction_hysteresis = config_entry.data.get(CONF_PD_DIRECTION_HYSTERESIS, DEFAULT_PD_DIRECTION_HYSTERESIS)
 
+        # Cached DEBUG level check, refreshed at the start of every control cycle
+        self._dbg = _LOGGER.isEnabledFor(logging.DEBUG)
+
+        # Parsed no-discharge time slots, rebuilt when the config entry data changes
+        self._slots_cache = None
+        self._slots_cache_key = None
+        self._slots_restrict_charge = False
+        # Per direction (is_charging): (key, valid_from_s, valid_until_s, allowed)
+        self._slot_decision_memo = {}
+
+        # Excluded devices as (power_sensor, included_in_consumption), parsed once from config
+        self._excluded_devices = tuple(
+            (device["power_sensor"], device.get("included_in_consumption", True))
+            for device in config_entry.data.get("excluded_devices", [])
+            if device.get("power_sensor")
+        )
+        # Last parsed value per excluded device sensor, keyed by the State object it came from
+        self._excluded_device_values = {}
+
         # Sensor filtering to avoid reacting to instantaneous spikes
-        self.sensor_history = []  # Keep last 3 readings for faster response
-        self.sensor_history_size = 2
+        self.sensor_history_size = SENSOR_FILTER_SIZE
+        self.sensor_history = deque(maxlen=self.sensor_history_size)  # Oldest reading drops off automatically
+        self._sensor_sum = 0.0  # Running sum of sensor_history
+        self._sensor_sum_updates = 0  # Samples since the running sum was last recomputed
+        self._inv_sensor_history_size = 1.0 / self.sensor_history_size  # Mean scale once the filter is full
 
         # PID controller state variables (Ki currently disabled)
         self.ki = 0.0          # Integral gain (DISABLED - using pure PD control)
         self.error_integral = 0.0      # Accumulated error
         self.previous_error = 0.0      # Previous error for derivative
-        self.dt = 2.0                  # Control loop time in seconds
-        self.integral_decay = 0.90     # Leaky integrator: 10% decay per cycle
+        self.dt = CONTROL_INTERVAL     # Control loop time in seconds
+        self._cycle_dt = self.dt       # Measured time since the previous cycle (seconds)
+        self._last_tick = time.monotonic()
+        # Leaky integrator: 10% decay per PD_TUNING_INTERVAL, applied per cycle
+        self.integral_decay = 0.90 ** (CONTROL_INTERVAL / PD_TUNING_INTERVAL)
+        self.back_calculation_gain = 0.1  # Anti-windup: share of the clipped output unwound per cycle
 
         # Oscillation detection for auto-reset
         self.sign_changes = 0           # Count of consecutive sign changes in error
@@ -94,12 +224,11 @@ class ChargeDischargeController:
         self.last_output_sign = 0        # Track last output direction (1=charge, -1=discharge, 0=idle)
         
         # Calculate dynamic anti-windup limits based on total system capacity
-        self.max_charge_capacity = sum(c.max_charge_power for c in coordinators)
-        self.max_discharge_capacity = sum(c.max_discharge_power for c in coordinators)
+        self.refresh_capacity_limits()
         
         # Predictive Grid Charging state
         self.predictive_charging_enabled = config_entry.data.get(CONF_ENABLE_PREDICTIVE_CHARGING, False)
-        self.charging_time_slot = config_entry.data.get(CONF_CHARGING_TIME_SLOT, None)
+        self.set_charging_time_slot(config_entry.data.get(CONF_CHARGING_TIME_SLOT, None))
         self.solar_forecast_sensor = config_entry.data.get(CONF_SOLAR_FORECAST_SENSOR, None)
         self.max_contracted_power = config_entry.data.get(CONF_MAX_CONTRACTED_POWER, 7000)
         
@@ -108,11 +237,19 @@ class ChargeDischargeController:
         self.last_evaluation_soc = None    # SOC at last check
         self.predictive_charging_overridden = False  # Manual override
         self._grid_charging_initialized = False  # Flag for initialization
+        self._allocated_batteries = frozenset()  # Batteries given power by the last allocation write
+        self._idle_confirmed_at = None  # Monotonic time all batteries last ACK'd an idle command
         self._last_decision_data = None  # Store last decision for diagnostics
+        self._pre_evaluated = False  # Pre-evaluation done for the upcoming slot
+        self._pre_eval_decision_data = None  # Pre-evaluation decision, applied at slot start
+        self._pre_eval_soc = None  # SOC at pre-evaluation
         # Consumption history for dynamic base consumption (7-day rolling average)
-        self._daily_consumption_history = []  # List of (date, consumption_kwh)
+        # Keyed by date (one entry per day) with running aggregates so the average is O(1)
+        self._daily_consumption_history: dict[date, float] = {}  # date -> consumption_kwh
+        self._history_sum = 0.0
+        self._history_real_dates: set[date] = set()  # Dates holding real (non-default) data
         # Persistent store for consumption history (survives restarts AND reloads)
-        self._consumption_store = Store(hass, 1, f"{DOMAIN}_consumption_history")
+        self._consumption_store = Store(hass, 1, f"{DOMAIN}_consumption_history", atomic_writes=True)
 
         # Manual mode state
         self.manual_mode_enabled = False  # True when user has paused auto control
@@ -120,9 +257,11 @@ class ChargeDischargeController:
         # Weekly Full Charge state
         self.weekly_full_charge_enabled = config_entry.data.get(CONF_ENABLE_WEEKLY_FULL_CHARGE, False)
         self.weekly_full_charge_day = config_entry.data.get(CONF_WEEKLY_FULL_CHARGE_DAY, "sun")
+        self._target_weekday = WEEKDAY_MAP[self.weekly_full_charge_day]  # datetime.weekday() of the charge day
         self.weekly_full_charge_complete = False  # True when ALL batteries reach 100%
         self.last_checked_weekday = None  # Track day transitions for reset logic
         self.weekly_full_charge_registers_written = False  # True when register 44000 set to 100%
+        self._pending_save_task = None  # Background task persisting the state, if running
 
         # Persistent storage for weekly charge completion state
         self._store = Store(hass, 1, f"{DOMAIN}.{config_entry.entry_id}.weekly_charge_state")
@@ -141,8 +280,89 @@ class ChargeDischargeController:
                      "ENABLED" if self.weekly_full_charge_enabled else "DISABLED",
                      self.weekly_full_charge_day.upper() if self.weekly_full_charge_enabled else "N/A")
 
-    def _is_operation_allowed(self, is_charging: bool) -> bool:
+    def set_charging_time_slot(self, charging_time_slot: dict | None) -> None:
+        """Set the predictive charging time slot and its parsed form.
+
+        The days are kept as a frozenset and the start/end times are parsed
+        once here, so the per-cycle window checks never touch the raw config.
+        """
+        self.charging_time_slot = charging_time_slot
+        self._charging_slot_days = frozenset(charging_time_slot.get("days", ()) if charging_time_slot else ())
+        # Parsed start/end of the charging slot (None if not configured or invalid)
+        self._charging_slot_start = None
+        self._charging_slot_end = None
+        if charging_time_slot:
+            try:
+                self._charging_slot_start = dt_time.fromisoformat(charging_time_slot["start_time"])
+                self._charging_slot_end = dt_time.fromisoformat(charging_time_slot["end_time"])
+            except Exception as e:
+                _LOGGER.error("Error parsing predictive charging time slot: %s", e)
+                self._charging_slot_start = self._charging_slot_end = None
+
+    def set_consumption_state(self, state) -> None:
+        """Store the consumption sensor state and parse its value once."""
+        self._consumption_state = state
+        try:
+            self._consumption_value = float(state.state) if state is not None else None
+        except (ValueError, TypeError):
+            self._consumption_value = None
+
+    @callback
+    def async_consumption_state_changed(self, event: Event) -> None:
+        """Keep the latest consumption sensor state for the control loop."""
+        self.set_consumption_state(event.data["new_state"])
+
+    def refresh_capacity_limits(self) -> None:
+        """Recalculate total charge/discharge capacity from the coordinators.
+
+        Call again whenever a coordinator's max_charge_power or
+        max_discharge_power changes so anti-windup limits don't go stale.
+        """
+        self.max_charge_capacity = sum(c.max_charge_power for c in self.coordinators)
+        self.max_discharge_capacity = sum(c.max_discharge_power for c in self.coordinators)
+        # Used to express the integral as a percentage; never zero
+        self._capacity_limit = max(self.max_charge_capacity, self.max_discharge_capacity) or 1.0
+
+    def _get_parsed_slots(self) -> tuple[tuple[int, int, int, bool], ...]:
+        """Return the no-discharge time slots parsed into integer form.
+
+        Each slot becomes (start_seconds, end_seconds, days_mask, apply_to_charge),
+        where seconds are counted from midnight and days_mask has bit 0 = Monday.
+        The result is cached until the slots list in the config entry changes,
+        together with whether any slot restricts charging.
+        """
+        time_slots = self.config_entry.data.get("no_discharge_time_slots", [])
+        if self._slots_cache is not None and self._slots_cache_key is time_slots:
+            return self._slots_cache
+
+        parsed = []
+        for i, slot in enumerate(time_slots):
+            try:
+                start = dt_time.fromisoformat(slot["start_time"])
+                end = dt_time.fromisoformat(slot["end_time"])
+            except Exception as e:
+                _LOGGER.error("Error parsing time slot %d: %s", i+1, e)
+                continue
+            days_mask = 0
+            for day in slot.get("days", []):
+                days_mask |= _WEEKDAY_BITS.get(day, 0)
+            parsed.append((
+                start.hour * 3600 + start.minute * 60 + start.second,
+                end.hour * 3600 + end.minute * 60 + end.second,
+                days_mask,
+                bool(slot.get("apply_to_charge", False)),
+            ))
+
+        self._slots_cache = tuple(parsed)
+        self._slots_cache_key = time_slots
+        # Derived from the parsed slots so unparseable entries are ignored here too
+        self._slots_restrict_charge = any(slot[3] for slot in self._slots_cache)
+        return self._slots_cache
+
+    def _is_operation_allowed(self, is_charging: bool, now: datetime | None = None) -> bool:
         """Check if charging or discharging is allowed based on time slots.
+
+        now is the current local time of the control cycle (read if not given).
         
         Logic:
         - If no time slots configured: Always allowed
@@ -153,82 +373,78 @@ class ChargeDischargeController:
           - Those specific slots also restrict charging
           - Charging only allowed during slots marked with apply_to_charge
         """
-        from datetime import datetime, time as dt_time
-        
-        # Read time slots from config entry (allows live updates from options flow)
-        time_slots = self.config_entry.data.get("no_discharge_time_slots", [])
+        # Parsed slots are cached and rebuilt only when the config entry changes
+        time_slots = self._get_parsed_slots()
         
         if not time_slots:
-            _LOGGER.debug("No time slots configured - operation always allowed")
+            if self._dbg:
+                _LOGGER.debug("No time slots configured - operation always allowed")
             return True
         
-        now = datetime.now()
-        current_time = now.time()
-        current_day = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"][now.weekday()]
-        
-        operation_type = "charging" if is_charging else "discharging"
-        
         # Special case: if charging and NO slot has apply_to_charge=True, charging is always allowed
-        if is_charging:
-            has_charge_restriction = any(slot.get("apply_to_charge", False) for slot in time_slots)
-            if not has_charge_restriction:
+        if is_charging and not self._slots_restrict_charge:
+            if self._dbg:
                 _LOGGER.debug("Charging always allowed - no slots restrict charging")
-                return True
+            return True
+        
+        now = now or dt_util.now()
+        current_seconds = now.hour * 3600 + now.minute * 60 + now.second
+
+        # Reuse the last decision for this direction while no slot start/end has been
+        # crossed since (kept per direction so charge/discharge flips don't evict it)
+        memo_key = (time_slots, now.date())
+        memo = self._slot_decision_memo.get(is_charging)
+        if memo is not None and memo[0] == memo_key and memo[1] <= current_seconds < memo[2]:
+            return memo[3]
+
+        day_bit = 1 << now.weekday()
         
-        _LOGGER.debug("Checking time slots for %s: current_time=%s, current_day=%s, slots=%s", 
-                     operation_type, current_time.strftime("%H:%M:%S"), current_day, time_slots)
+        if self._dbg:
+            _LOGGER.debug("Checking time slots for %s: current_time=%s, current_day=%s",
+                         "charging" if is_charging else "discharging",
+                         _format_seconds(current_seconds), _WEEKDAYS[now.weekday()])
         
-        for i, slot in enumerate(time_slots):
-            # Check if this slot applies to the current operation (charge/discharge)
-            apply_to_charge = slot.get("apply_to_charge", False)
-            
+        allowed = False
+        valid_from, valid_until = 0, 86400
+        for i, (start, end, days_mask, apply_to_charge) in enumerate(time_slots):
             # Skip slot if it's charging and this slot doesn't restrict charging
+            # For discharge, all slots apply
             if is_charging and not apply_to_charge:
-                _LOGGER.debug("Slot %d: Skipping for charging (apply_to_charge=False)", i+1)
                 continue
-            # For discharge, all slots apply
-            
-            _LOGGER.debug("Checking slot %d: start=%s, end=%s, days=%s, apply_to_charge=%s", 
-                         i+1, slot.get("start_time"), slot.get("end_time"), slot.get("days"), apply_to_charge)
             
             # Check if current day is in the slot's days
-            if current_day not in slot["days"]:
-                _LOGGER.debug("Slot %d: Current day %s not in slot days %s", i+1, current_day, slot["days"])
+            if not days_mask & day_bit:
                 continue
-            
-            # Parse start and end times from the slot
-            try:
-                start_time = dt_time.fromisoformat(slot["start_time"])
-                end_time = dt_time.fromisoformat(slot["end_time"])
-            except Exception as e:
-                _LOGGER.error("Error parsing time slot %d: %s", i+1, e)
-                continue
-            
-            _LOGGER.debug("Slot %d: Checking if %s is between %s and %s", 
-                         i+1, current_time.strftime("%H:%M:%S"), 
-                         start_time.strftime("%H:%M:%S"), end_time.strftime("%H:%M:%S"))
-            
-            # Check if current time is within the slot
-            if start_time <= end_time:
-                # Normal case: slot doesn't cross midnight
-                if start_time <= current_time <= end_time:
-                    _LOGGER.info("MATCH! Slot %d: %s IS ALLOWED - time %s within %s - %s (day: %s)", 
-                                i+1, operation_type.upper(), current_time.strftime("%H:%M:%S"), 
-                                start_time.strftime("%H:%M:%S"), end_time.strftime("%H:%M:%S"), current_day)
-                    return True
-            else:
-                # Slot crosses midnight
-                if current_time >= start_time or current_time <= end_time:
-                    _LOGGER.info("MATCH! Slot %d: %s IS ALLOWED - time %s within %s - %s (crosses midnight, day: %s)", 
-                                i+1, operation_type.upper(), current_time.strftime("%H:%M:%S"), 
-                                start_time.strftime("%H:%M:%S"), end_time.strftime("%H:%M:%S"), current_day)
-                    return True
-        
-        _LOGGER.info("No matching time slot found - %s NOT ALLOWED (slots configured but none match)", operation_type.upper())
-        return False
 
-    def _get_available_batteries(self, is_charging: bool) -> list:
+            # Slot edges bound the interval in which this decision stays valid
+            for edge in (start, (end + 1) % 86400):
+                if edge <= current_seconds:
+                    valid_from = max(valid_from, edge)
+                else:
+                    valid_until = min(valid_until, edge)
+            
+            # Normal case: slot doesn't cross midnight; otherwise the slot wraps around
+            if not allowed and (
+                (start <= end and start <= current_seconds <= end) or
+                (start > end and (current_seconds >= start or current_seconds <= end))
+            ):
+                _LOGGER.info("MATCH! Slot %d: %s IS ALLOWED - time %s within %s - %s (day: %s)",
+                            i+1, "CHARGING" if is_charging else "DISCHARGING",
+                            _format_seconds(current_seconds), _format_seconds(start),
+                            _format_seconds(end), _WEEKDAYS[now.weekday()])
+                allowed = True
+        
+        if not allowed:
+            _LOGGER.info("No matching time slot found - %s NOT ALLOWED (slots configured but none match)",
+                         "CHARGING" if is_charging else "DISCHARGING")
+
+        self._slot_decision_memo[is_charging] = (memo_key, valid_from, valid_until, allowed)
+        return allowed
+
+    def _get_available_batteries(self, is_charging: bool, weekly_charge_active: bool) -> list:
         """Get list of available batteries for the current operation.
+
+        weekly_charge_active is evaluated once per control cycle by the caller.
         
         For charging with hysteresis:
           1. Battery charges normally until reaching max_soc
@@ -243,18 +459,15 @@ class ChargeDischargeController:
             if coordinator.data is None:
                 continue
                 
-            current_soc = coordinator.data.get("battery_soc", 0)
+            current_soc = coordinator.battery_soc
             
             if is_charging:
-                # Check if weekly full charge is active
-                weekly_charge_active = self._is_weekly_full_charge_active()
-
                 # Update hysteresis state if enabled
                 if coordinator.enable_charge_hysteresis:
                     # Weekly full charge overrides hysteresis
                     if weekly_charge_active:
                         # Force-disable hysteresis during weekly charge
-                        if coordinator._hysteresis_active:
+                        if coordinator._hysteresis_active and self._dbg:
                             _LOGGER.debug("%s: Overriding hysteresis for weekly full charge", coordinator.name)
                         coordinator._hysteresis_active = False
                     else:
@@ -267,15 +480,17 @@ class ChargeDischargeController:
                             coordinator._hysteresis_active = False
 
                         if coordinator._hysteresis_active:
-                            _LOGGER.debug("%s: Skipping charge - Hysteresis active (SOC %.1f%%, threshold: %.1f%%)",
-                                         coordinator.name, current_soc, charge_threshold)
+                            if self._dbg:
+                                _LOGGER.debug("%s: Skipping charge - Hysteresis active (SOC %.1f%%, threshold: %.1f%%)",
+                                             coordinator.name, current_soc, charge_threshold)
                             continue
 
                 # Determine effective max SOC
                 if weekly_charge_active:
                     effective_max_soc = 100
-                    _LOGGER.debug("%s: Weekly Full Charge active - effective_max_soc=100%% (configured: %d%%)",
-                                 coordinator.name, coordinator.max_soc)
+                    if self._dbg:
+                        _LOGGER.debug("%s: Weekly Full Charge active - effective_max_soc=100%% (configured: %d%%)",
+                                     coordinator.name, coordinator.max_soc)
                 else:
                     effective_max_soc = coordinator.max_soc
 
@@ -288,7 +503,7 @@ class ChargeDischargeController:
         
         return available_batteries
 
-    def _is_weekly_full_charge_active(self) -> bool:
+    def _is_weekly_full_charge_active(self, now: datetime | None = None) -> bool:
         """Check if weekly full charge is currently active.
 
         Returns True if:
@@ -301,34 +516,33 @@ class ChargeDischargeController:
         if not self.weekly_full_charge_enabled:
             return False
 
-        from datetime import datetime
-
-        now = datetime.now()
-        current_weekday = now.weekday()
-        target_weekday = WEEKDAY_MAP[self.weekly_full_charge_day]
+        current_weekday = (now or dt_util.now()).weekday()
+        target_weekday = self._target_weekday
 
-        # Handle day boundary transitions
-        if self.last_checked_weekday is not None and self.last_checked_weekday != current_weekday:
+        # Handle day boundary transitions (skipped entirely while the day is unchanged)
+        if self.last_checked_weekday != current_weekday:
             # Day changed - check if we're exiting the target day
-            if self.last_checked_weekday == target_weekday and current_weekday != target_weekday:
+            if self.last_checked_weekday == target_weekday:
                 # Just exited the target day - reset flags for next week
                 _LOGGER.info("Weekly Full Charge: Exited %s, resetting flags for next week",
                             self.weekly_full_charge_day.upper())
                 self.weekly_full_charge_complete = False
                 self.weekly_full_charge_registers_written = False
-                # Save the cleared state asynchronously (don't await to avoid blocking)
-                asyncio.create_task(self._save_weekly_charge_state())
+                # Save the cleared state in a tracked background task (don't await to avoid blocking)
+                if self._pending_save_task is None or self._pending_save_task.done():
+                    self._pending_save_task = self.hass.async_create_background_task(
+                        self._save_weekly_charge_state(), name="marstek_save_weekly_charge"
+                    )
 
-        self.last_checked_weekday = current_weekday
+            self.last_checked_weekday = current_weekday
 
         # Check if we're on the target day and haven't completed yet
-        is_target_day = current_weekday == target_weekday
-
-        if not is_target_day:
+        if current_weekday != target_weekday:
             return False
 
         if self.weekly_full_charge_complete:
-            _LOGGER.debug("Weekly Full Charge: On target day but already completed - using normal max_soc")
+            if self._dbg:
+                _LOGGER.debug("Weekly Full Charge: On target day but already completed - using normal max_soc")
             return False
 
         # Active: on target day and not yet complete
@@ -349,11 +563,8 @@ class ChargeDischargeController:
                 _LOGGER.debug("Weekly Full Charge: No persisted state found")
                 return
 
-            from datetime import datetime
-
-            now = datetime.now()
-            current_weekday = now.weekday()
-            target_weekday = WEEKDAY_MAP[self.weekly_full_charge_day]
+            current_weekday = dt_util.now().weekday()
+            target_weekday = self._target_weekday
 
             # Only restore state if we're still on the completion day
             stored_completion_day = data.get("completion_weekday")
@@ -374,8 +585,7 @@ class ChargeDischargeController:
             return
 
         try:
-            from datetime import datetime
-            now = datetime.now()
+            now = dt_util.now()
 
             data = {
                 "complete": self.weekly_full_charge_complete,
@@ -389,7 +599,7 @@ class ChargeDischargeController:
         except Exception as e:
             _LOGGER.error("Weekly Full Charge: Failed to save state: %s", e)
 
-    async def _handle_weekly_full_charge_registers(self) -> None:
+    async def _handle_weekly_full_charge_registers(self, weekly_charge_active: bool) -> bool:
         """
         Manage weekly full charge register writes and completion detection.
 
@@ -401,13 +611,27 @@ class ChargeDischargeController:
         - Detect completion (all batteries at 100%)
         - Restore register 44000 to configured max_soc when complete
         - Re-enable hysteresis after completion
+
+        Returns whether weekly full charge is still active after completion detection.
         """
-        if not self.weekly_full_charge_enabled or not self._is_weekly_full_charge_active():
-            return
+        if not self.weekly_full_charge_enabled or not weekly_charge_active:
+            return False
 
         # Write register 44000 to 100% on first activation (v2 only - v3 uses software enforcement)
         if not self.weekly_full_charge_registers_written:
             _LOGGER.info("Weekly Full Charge: Activating for compatible batteries")
+
+            async def _activate(coordinator, cutoff_reg):
+                # v2 batteries: write hardware register
+                try:
+                    # Write 1000 to register 44000 (100% = 1000 in register scale)
+                    await coordinator.write_register(cutoff_reg, 1000, do_refresh=False)
+                    if self._dbg:
+                        _LOGGER.debug("%s: Set hardware charging cutoff to 100%%", coordinator.name)
+                except Exception as e:
+                    _LOGGER.error("%s: Failed to write charging cutoff register: %s", coordinator.name, e)
+
+            writes = []
             for coordinator in self.coordinators:
                 cutoff_reg = coordinator.get_register("charging_cutoff_capacity")
 
@@ -421,20 +645,14 @@ class ChargeDischargeController:
                     # since effective_max_soc is set to 100 when weekly charge is active
                     continue
 
-                # v2 batteries: write hardware register
-                try:
-                    # Write 1000 to register 44000 (100% = 1000 in register scale)
-                    await coordinator.write_register(cutoff_reg, 1000, do_refresh=False)
-                    await asyncio.sleep(0.1)
-                    _LOGGER.debug("%s: Set hardware charging cutoff to 100%%", coordinator.name)
-                except Exception as e:
-                    _LOGGER.error("%s: Failed to write charging cutoff register: %s", coordinator.name, e)
+                writes.append(_activate(coordinator, cutoff_reg))
 
+            await asyncio.gather(*writes)
             self.weekly_full_charge_registers_written = True
 
         # Check if all batteries reached 100%
         all_batteries_full = all(
-            c.data.get("battery_soc", 0) >= 100
+            c.battery_soc >= 100
             for c in self.coordinators if c.data
         )
 
@@ -443,34 +661,69 @@ class ChargeDischargeController:
             _LOGGER.info("Weekly Full Charge: Complete - reverting to configured limits")
             self.weekly_full_charge_complete = True
 
-            # Restore register 44000 to original max_soc values (v2 only)
-            for coordinator in self.coordinators:
-                cutoff_reg = coordinator.get_register("charging_cutoff_capacity")
-
-                if cutoff_reg is None:
-                    _LOGGER.debug("%s: No hardware cutoff register to restore (v3 battery)", coordinator.name)
-                    # v3: software enforcement automatically reverts to max_soc
-                    continue
-
+            async def _restore(coordinator, cutoff_reg):
                 # v2: restore hardware register
                 try:
                     max_soc_value = int(coordinator.max_soc / 0.1)  # Convert to register value
                     await coordinator.write_register(cutoff_reg, max_soc_value, do_refresh=False)
-                    await asyncio.sleep(0.1)
-                    _LOGGER.debug("%s: Restored hardware cutoff to %d%% (reg=%d)",
-                                coordinator.name, coordinator.max_soc, max_soc_value)
+                    if self._dbg:
+                        _LOGGER.debug("%s: Restored hardware cutoff to %d%% (reg=%d)",
+                                    coordinator.name, coordinator.max_soc, max_soc_value)
                 except Exception as e:
                     _LOGGER.error("%s: Failed to restore charging cutoff register: %s", coordinator.name, e)
 
-            # Re-enable hysteresis for batteries that have it configured
+            # Restore register 44000 to original max_soc values (v2 only) and
+            # re-enable hysteresis for batteries that have it configured
+            writes = []
             for coordinator in self.coordinators:
                 if coordinator.enable_charge_hysteresis:
                     coordinator._hysteresis_active = True
-                    _LOGGER.debug("%s: Re-enabled hysteresis after weekly full charge", coordinator.name)
+                    if self._dbg:
+                        _LOGGER.debug("%s: Re-enabled hysteresis after weekly full charge", coordinator.name)
+
+                cutoff_reg = coordinator.get_register("charging_cutoff_capacity")
+                if cutoff_reg is None:
+                    if self._dbg:
+                        _LOGGER.debug("%s: No hardware cutoff register to restore (v3 battery)", coordinator.name)
+                    # v3: software enforcement automatically reverts to max_soc
+                    continue
+
+                writes.append(_restore(coordinator, cutoff_reg))
+
+            await asyncio.gather(*writes)
 
             # Persist the completion state so it survives HA restarts
             await self._save_weekly_charge_state()
 
+        return not self.weekly_full_charge_complete
+
+    def _filter_sensor(self, sensor_raw: float) -> float:
+        """Add a reading to the moving average filter and return the filtered value."""
+        full = len(self.sensor_history) == self.sensor_history_size
+        if full:
+            # The deque drops its oldest reading on append; remove it from the sum first
+            self._sensor_sum -= self.sensor_history[0]
+        self.sensor_history.append(sensor_raw)
+        self._sensor_sum_updates += 1
+        if self._sensor_sum_updates >= _SENSOR_SUM_RESYNC_SAMPLES:
+            self._sensor_sum = math.fsum(self.sensor_history)
+            self._sensor_sum_updates = 0
+        else:
+            self._sensor_sum += sensor_raw
+        if full:
+            return self._sensor_sum * self._inv_sensor_history_size
+        return self._sensor_sum / len(self.sensor_history)
+
+    def _average_soc(self) -> float:
+        """Average SOC over the batteries that have reported data."""
+        soc_sum = 0.0
+        data_count = 0
+        for c in self.coordinators:
+            if c.data:
+                soc_sum += c.battery_soc
+                data_count += 1
+        return soc_sum / (data_count or 1)
+
     def _round_to_5w(self, value: float) -> int:
         """Round value to nearest 5W granularity."""
         return round(value / 5) * 5
@@ -480,7 +733,7 @@ class ChargeDischargeController:
         _LOGGER.warning("PID: MANUAL RESET requested - clearing all PID state variables")
         _LOGGER.info("PID: Previous state - integral=%.1fW (%.1f%%), previous_error=%.1fW, sign_changes=%d",
                     self.error_integral, 
-                    (abs(self.error_integral) / max(self.max_charge_capacity, self.max_discharge_capacity)) * 100,
+                    (abs(self.error_integral) / self._capacity_limit) * 100,
                     self.previous_error, self.sign_changes)
         
         self.error_integral = 0.0
@@ -490,37 +743,91 @@ class ChargeDischargeController:
         self.last_output_sign = 0
         self.previous_power = 0
         self.sensor_history.clear()
+        self._sensor_sum = 0.0
+        self._sensor_sum_updates = 0
         self.first_execution = True  # Force re-initialization on next cycle
         
         _LOGGER.info("PID: State reset complete - system will re-initialize on next control cycle")
 
+    def _consumption_history_items(self) -> list[tuple[date, float]]:
+        """Return consumption history as a list of (date, consumption_kwh) tuples."""
+        return list(self._daily_consumption_history.items())
+
+    def _set_consumption_history_entry(self, day: date, value: float) -> bool:
+        """Set the consumption for a day, keeping the running aggregates in sync.
+
+        Returns True if an existing entry for that day was replaced.
+        """
+        previous = self._daily_consumption_history.get(day)
+        self._daily_consumption_history[day] = value
+        if previous is not None:
+            self._history_sum -= previous
+
+        self._history_sum += value
+        if value != DEFAULT_BASE_CONSUMPTION_KWH:
+            self._history_real_dates.add(day)
+        else:
+            self._history_real_dates.discard(day)
+        return previous is not None
+
+    def _replace_consumption_history(self, entries) -> None:
+        """Replace the whole consumption history with (date, consumption_kwh) entries."""
+        self._daily_consumption_history = {}
+        self._history_sum = 0.0
+        self._history_real_dates = set()
+        for day, value in entries:
+            self._set_consumption_history_entry(day, value)
+
+    def _prune_consumption_history(self, cutoff_date: date) -> None:
+        """Drop history entries on or before cutoff_date."""
+        history = self._daily_consumption_history
+        for day in [d for d in history if d <= cutoff_date]:
+            self._history_sum -= history.pop(day)
+            self._history_real_dates.discard(day)
+
+    def _consumption_history_data(self) -> dict:
+        """Return consumption history in its persisted form."""
+        # Dates are stored as ordinals (ints); older stores used ISO strings
+        return {
+            "history": [
+                (d.toordinal(), c) for d, c in self._daily_consumption_history.items()
+            ]
+        }
+
     async def _save_consumption_history(self) -> None:
-        """Persist consumption history to disk via HA Store."""
+        """Persist consumption history to disk via HA Store immediately."""
         try:
-            data = {
-                "history": [
-                    (d.isoformat(), c) for d, c in self._daily_consumption_history
-                ]
-            }
-            await self._consumption_store.async_save(data)
+            await self._consumption_store.async_save(self._consumption_history_data())
         except Exception as e:
             _LOGGER.error("Failed to save consumption history: %s", e)
 
+    def _schedule_consumption_history_save(self) -> None:
+        """Persist consumption history after a short delay.
+
+        Repeated calls within the delay are coalesced into a single write, and
+        the Store also flushes pending data when Home Assistant stops.
+        """
+        self._consumption_store.async_delay_save(
+            self._consumption_history_data, CONSUMPTION_HISTORY_SAVE_DELAY
+        )
+
     async def _load_consumption_history(self) -> bool:
         """Load consumption history from HA Store. Returns True if data was loaded."""
-        from datetime import date
         try:
             data = await self._consumption_store.async_load()
             if data and "history" in data and data["history"]:
-                self._daily_consumption_history = [
-                    (date.fromisoformat(date_str), consumption)
-                    for date_str, consumption in data["history"]
-                ]
+                history = data["history"]
+                # The whole history is saved at once, so one entry tells the date format
+                to_date = date.fromisoformat if isinstance(history[0][0], str) else date.fromordinal
+                self._replace_consumption_history(
+                    (to_date(stored_date), consumption)
+                    for stored_date, consumption in history
+                )
                 _LOGGER.info(
                     "Loaded consumption history from store: %d days (oldest: %s, newest: %s)",
                     len(self._daily_consumption_history),
-                    self._daily_consumption_history[0][0] if self._daily_consumption_history else "N/A",
-                    self._daily_consumption_history[-1][0] if self._daily_consumption_history else "N/A"
+                    min(self._daily_consumption_history, default="N/A"),
+                    max(self._daily_consumption_history, default="N/A")
                 )
                 return True
             _LOGGER.debug("No consumption history found in store")
@@ -536,32 +843,26 @@ class ChargeDischargeController:
         Daily values are automatically captured at 23:55 by scheduled task.
         This method performs opportunistic backfill from history if needed.
         """
-        from datetime import date, datetime, timedelta
-
-        today = date.today()
+        today = dt_util.now().date()
         entity_id = "sensor.marstek_venus_system_daily_discharging_energy"
 
         # OPPORTUNISTIC BACKFILL: Replace default entries with real data from HA history
         # This recovers real data after restarts or when defaults were pre-populated
-        real_data_dates = {d for d, c in self._daily_consumption_history if c != DEFAULT_BASE_CONSUMPTION_KWH}
-        if len(real_data_dates) < 7:
-            for days_ago in range(1, 8):  # Look back 7 days (excluding today)
-                past_date = today - timedelta(days=days_ago)
-                if past_date not in real_data_dates:
-                    # Try to capture this missing day from history
-                    await self._capture_from_history(entity_id, past_date)
-                    await asyncio.sleep(0.1)  # Small delay between history queries
+        if len(self._history_real_dates) < 7:
+            # Look back 7 days (excluding today) and capture missing days in one query
+            missing_dates = self._missing_history_dates(today)
+            await self._capture_from_history(entity_id, missing_dates, today)
 
         # Calculate average from history
-        if len(self._daily_consumption_history) == 0:
+        history_len = len(self._daily_consumption_history)
+        if history_len == 0:
             _LOGGER.warning(
                 "No consumption history, using fallback: %.1f kWh",
                 DEFAULT_BASE_CONSUMPTION_KWH
             )
             return DEFAULT_BASE_CONSUMPTION_KWH
 
-        total = sum(consumption for _, consumption in self._daily_consumption_history)
-        average = total / len(self._daily_consumption_history)
+        average = self._history_sum / history_len
 
         if average <= 0:
             _LOGGER.warning(
@@ -570,26 +871,35 @@ class ChargeDischargeController:
             )
             return DEFAULT_BASE_CONSUMPTION_KWH
 
-        real_count = sum(1 for _, c in self._daily_consumption_history if c != DEFAULT_BASE_CONSUMPTION_KWH)
+        real_count = len(self._history_real_dates)
         _LOGGER.info(
             "Dynamic base consumption: %.1f kWh (avg of %d days, %d real + %d defaults)",
-            average, len(self._daily_consumption_history),
-            real_count, len(self._daily_consumption_history) - real_count
+            average, history_len, real_count, history_len - real_count
         )
 
         return average
 
-    async def _capture_from_history(self, entity_id: str, target_date: date) -> None:
-        """Capture daily consumption from HA history for a specific date.
+    def _missing_history_dates(self, today: date) -> list[date]:
+        """Return the past 7 days (excluding today) that have no real consumption value yet."""
+        real_dates = self._history_real_dates
+        return [
+            past_date for past_date in (today - timedelta(days=days_ago) for days_ago in range(1, 8))
+            if past_date not in real_dates
+        ]
+
+    async def _capture_from_history(self, entity_id: str, target_dates: list[date], today: date) -> None:
+        """Capture daily consumption from HA history for the given dates.
 
-        Gets the maximum value from the target date (final reading before reset).
+        Issues a single recorder query spanning all target dates and gets the
+        maximum value of each date (final reading before reset).
 
         Args:
             entity_id: Entity ID of the daily sensor
-            target_date: Date to capture data for
+            target_dates: Dates to capture data for
+            today: Current local date, used as the history pruning reference
         """
-        from datetime import date, datetime, timedelta
-        from homeassistant.util import dt as dt_util
+        if not target_dates:
+            return
 
         try:
             from homeassistant.components.recorder import history
@@ -597,75 +907,79 @@ class ChargeDischargeController:
             _LOGGER.warning("Recorder history module not available for backfill")
             return
 
-        # Define time range for the target date in local timezone
+        # Define time range covering all target dates in local timezone
         local_tz = dt_util.get_time_zone(self.hass.config.time_zone) or dt_util.UTC
-        start_time = datetime.combine(target_date, datetime.min.time()).replace(tzinfo=local_tz)
-        end_time = datetime.combine(target_date, datetime.max.time()).replace(tzinfo=local_tz)
+        start_time = datetime.combine(min(target_dates), datetime.min.time()).replace(tzinfo=local_tz)
+        end_time = datetime.combine(max(target_dates), datetime.max.time()).replace(tzinfo=local_tz)
 
-        _LOGGER.debug(
-            "Backfill attempt: entity=%s, date=%s, range=%s to %s",
-            entity_id, target_date, start_time, end_time
-        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Backfill attempt: entity=%s, dates=%s, range=%s to %s",
+                entity_id, [d.isoformat() for d in target_dates], start_time, end_time
+            )
 
         try:
             # Get history for the entity using the recorder's own executor
             from homeassistant.components.recorder import get_instance
             recorder_instance = get_instance(self.hass)
+            # Only the state values are needed, so skip loading attributes for every row
             states = await recorder_instance.async_add_executor_job(
-                history.state_changes_during_period,
-                self.hass,
-                start_time,
-                end_time,
-                entity_id
+                partial(
+                    history.state_changes_during_period,
+                    self.hass,
+                    start_time,
+                    end_time,
+                    entity_id,
+                    no_attributes=True,
+                )
             )
 
             if entity_id not in states or len(states[entity_id]) == 0:
-                _LOGGER.debug("No history found for %s on %s", entity_id, target_date)
+                _LOGGER.debug("No history found for %s between %s and %s",
+                              entity_id, min(target_dates), max(target_dates))
                 return
 
-            # Find the maximum value (final reading before reset)
-            max_value = 0.0
-            state_count = 0
-            for state in states[entity_id]:
-                state_count += 1
-                if state.state not in ['unknown', 'unavailable']:
-                    try:
-                        value = float(state.state)
-                        max_value = max(max_value, value)
-                    except (ValueError, TypeError):
-                        continue
+            # States come back in chronological order, so group them by local date
+            # and take each date's maximum value in one max() call
+            max_values = dict.fromkeys(target_dates, 0.0)
+            state_counts = dict.fromkeys(target_dates, 0)
+            for state_date, group in groupby(
+                states[entity_id], key=lambda state: state.last_updated.astimezone(local_tz).date()
+            ):
+                if state_date not in max_values:
+                    continue
+                day_states = list(group)
+                state_counts[state_date] += len(day_states)
+                max_values[state_date] = max(
+                    max_values[state_date], max(_numeric_states(day_states), default=0.0)
+                )
 
-            _LOGGER.debug(
-                "Backfill query result: %d states found, max_value=%.2f for %s on %s",
-                state_count, max_value, entity_id, target_date
-            )
+            captured = False
+            for target_date in sorted(max_values):
+                max_value = max_values[target_date]
+                _LOGGER.debug(
+                    "Backfill query result: %d states found, max_value=%.2f for %s on %s",
+                    state_counts[target_date], max_value, entity_id, target_date
+                )
 
-            if max_value >= 1.5:
-                # Replace existing entry for this date (including defaults) or append
-                replaced = False
-                for i, (d, c) in enumerate(self._daily_consumption_history):
-                    if d == target_date:
-                        self._daily_consumption_history[i] = (target_date, max_value)
-                        replaced = True
-                        break
-                if not replaced:
-                    self._daily_consumption_history.append((target_date, max_value))
+                if max_value >= 1.5:
+                    # Replace existing entry for this date (including defaults) or append
+                    replaced = self._set_consumption_history_entry(target_date, max_value)
+                    captured = True
 
-                _LOGGER.info(
-                    "Captured daily consumption from history: %.1f kWh for %s (%s, history: %d days)",
-                    max_value, target_date,
-                    "replaced default" if replaced else "new entry",
-                    len(self._daily_consumption_history)
-                )
+                    _LOGGER.info(
+                        "Captured daily consumption from history: %.1f kWh for %s (%s, history: %d days)",
+                        max_value, target_date,
+                        "replaced default" if replaced else "new entry",
+                        len(self._daily_consumption_history)
+                    )
 
+            if captured:
                 # Cleanup: keep only last 7 days
-                cutoff_date = date.today() - timedelta(days=7)
-                self._daily_consumption_history = [
-                    (d, c) for d, c in self._daily_consumption_history
-                    if d > cutoff_date
-                ]
+                self._prune_consumption_history(today - timedelta(days=7))
         except Exception as e:
-            _LOGGER.error("Failed to capture from history for %s on %s: %s", entity_id, target_date, e)
+            _LOGGER.error("Failed to capture from history for %s on %s: %s",
+                          entity_id, [d.isoformat() for d in target_dates], e)
 
     async def _startup_backfill_consumption(self) -> None:
         """Run backfill from recorder history shortly after startup.
@@ -673,58 +987,48 @@ class ChargeDischargeController:
         Called once after a delay to give the recorder and coordinators time
         to initialize. Replaces default entries with real historical data.
         """
-        from datetime import date, timedelta
-
         if not self.predictive_charging_enabled:
             return
 
         entity_id = "sensor.marstek_venus_system_daily_discharging_energy"
-        today = date.today()
+        today = dt_util.now().date()
 
         _LOGGER.info(
             "Startup backfill: attempting to replace defaults with real data "
             "(current history: %d entries, %d real)",
             len(self._daily_consumption_history),
-            sum(1 for _, c in self._daily_consumption_history if c != DEFAULT_BASE_CONSUMPTION_KWH)
+            len(self._history_real_dates)
         )
 
         # Also capture today's running total from coordinators if available
-        coordinators_with_data = [c for c in self.coordinators if c.data]
-        if coordinators_with_data:
-            today_value = sum(
-                c.data.get("total_daily_discharging_energy", 0)
-                for c in coordinators_with_data
-            )
+        has_data = False
+        today_value = 0.0
+        for c in self.coordinators:
+            if c.data:
+                has_data = True
+                today_value += c.daily_discharging_energy
+        if has_data:
             if today_value >= 1.5:
                 # Replace today's default with current running total
-                for i, (d, c) in enumerate(self._daily_consumption_history):
-                    if d == today:
-                        if c == DEFAULT_BASE_CONSUMPTION_KWH:
-                            self._daily_consumption_history[i] = (today, today_value)
-                            _LOGGER.info(
-                                "Startup backfill: replaced today's default with current value: %.2f kWh",
-                                today_value
-                            )
-                        break
+                if today in self._daily_consumption_history and today not in self._history_real_dates:
+                    self._set_consumption_history_entry(today, today_value)
+                    _LOGGER.info(
+                        "Startup backfill: replaced today's default with current value: %.2f kWh",
+                        today_value
+                    )
 
         # Try to backfill past days from recorder history
-        real_data_dates = {d for d, c in self._daily_consumption_history if c != DEFAULT_BASE_CONSUMPTION_KWH}
-        backfill_count = 0
-        for days_ago in range(1, 8):
-            past_date = today - timedelta(days=days_ago)
-            if past_date not in real_data_dates:
-                await self._capture_from_history(entity_id, past_date)
-                await asyncio.sleep(0.1)
-                backfill_count += 1
+        missing_dates = self._missing_history_dates(today)
+        backfill_count = len(missing_dates)
+        await self._capture_from_history(entity_id, missing_dates, today)
 
-        real_after = sum(1 for _, c in self._daily_consumption_history if c != DEFAULT_BASE_CONSUMPTION_KWH)
         _LOGGER.info(
             "Startup backfill complete: attempted %d days, now %d real entries out of %d total",
-            backfill_count, real_after, len(self._daily_consumption_history)
+            backfill_count, len(self._history_real_dates), len(self._daily_consumption_history)
         )
 
         # Persist updated history to disk
-        await self._save_consumption_history()
+        self._schedule_consumption_history_save()
 
     def _initialize_consumption_history_with_defaults(self) -> None:
         """Initialize consumption history with default values for the past 7 days.
@@ -734,10 +1038,8 @@ class ChargeDischargeController:
 
         Only initializes if history is completely empty (first-time setup).
         """
-        from datetime import date, timedelta
-
         # Only initialize if history is empty
-        if len(self._daily_consumption_history) > 0:
+        if self._daily_consumption_history:
             return
 
         _LOGGER.info(
@@ -745,12 +1047,12 @@ class ChargeDischargeController:
             DEFAULT_BASE_CONSUMPTION_KWH
         )
 
-        today = date.today()
+        today = dt_util.now().date()
 
         # Pre-populate with 7 days of fallback values (6 days ago through today)
         for days_ago in range(6, -1, -1):
             past_date = today - timedelta(days=days_ago)
-            self._daily_consumption_history.append((past_date, DEFAULT_BASE_CONSUMPTION_KWH))
+            self._set_consumption_history_entry(past_date, DEFAULT_BASE_CONSUMPTION_KWH)
 
         _LOGGER.info(
             "Pre-populated consumption history with %d days of default values",
@@ -770,24 +1072,23 @@ class ChargeDischargeController:
         Args:
             now: Timestamp from scheduler (unused, for compatibility)
         """
-        from datetime import date, timedelta
-
         if not self.predictive_charging_enabled:
             return  # Don't capture if predictive charging is disabled
 
-        today = date.today()
+        today = dt_util.now().date()
 
         # Read directly from coordinator data (sum across all batteries)
-        coordinators_with_data = [c for c in self.coordinators if c.data]
-        if not coordinators_with_data:
+        has_data = False
+        current_value = 0.0
+        for c in self.coordinators:
+            if c.data:
+                has_data = True
+                current_value += c.daily_discharging_energy
+        if not has_data:
             _LOGGER.warning("Daily consumption capture: no coordinators with data available")
             return
 
         try:
-            current_value = sum(
-                c.data.get("total_daily_discharging_energy", 0)
-                for c in coordinators_with_data
-            )
 
             # Only capture if we have meaningful data (>= 1.5 kWh)
             if current_value < 1.5:
@@ -797,36 +1098,30 @@ class ChargeDischargeController:
                 )
                 return
 
-            # Check if today's data already exists
-            has_today = any(d == today for d, _ in self._daily_consumption_history)
+            # Nothing to rewrite or persist if today's value is already current
+            if self._daily_consumption_history.get(today) == current_value:
+                _LOGGER.debug(
+                    "Daily consumption capture: today's value unchanged (%.2f kWh)", current_value
+                )
+                return
 
-            if has_today:
-                # Update today's value (replace with latest reading)
-                self._daily_consumption_history = [
-                    (d, current_value if d == today else c)
-                    for d, c in self._daily_consumption_history
-                ]
+            # Update today's value (replace with latest reading) or add it
+            if self._set_consumption_history_entry(today, current_value):
                 _LOGGER.info(
                     "Daily consumption capture: UPDATED today's value: %.2f kWh (%d days in history)",
                     current_value, len(self._daily_consumption_history)
                 )
             else:
-                # Add today's value
-                self._daily_consumption_history.append((today, current_value))
                 _LOGGER.info(
                     "Daily consumption capture: CAPTURED today's value: %.2f kWh (%d days in history)",
                     current_value, len(self._daily_consumption_history)
                 )
 
                 # Cleanup: keep only last 7 days
-                cutoff_date = today - timedelta(days=7)
-                self._daily_consumption_history = [
-                    (d, c) for d, c in self._daily_consumption_history
-                    if d > cutoff_date
-                ]
+                self._prune_consumption_history(today - timedelta(days=7))
 
             # Persist updated history to disk
-            await self._save_consumption_history()
+            self._schedule_consumption_history_save()
 
         except (ValueError, TypeError) as e:
             _LOGGER.error("Daily consumption capture: Failed to parse sensor value: %s", e)
@@ -878,9 +1173,23 @@ class ChargeDischargeController:
                 "reason": "Predictive charging disabled"
             }
 
+        # Aggregate battery data in a single pass over the coordinators
+        total_capacity_kwh = 0.0
+        soc_sum = 0.0
+        data_count = 0
+        min_soc = None
+        for c in self.coordinators:
+            # Use max min_soc if mixed configs for safety
+            min_soc = c.min_soc if min_soc is None else max(min_soc, c.min_soc)
+            d = c.data
+            if not d:
+                continue
+            total_capacity_kwh += d.get("battery_total_energy", 0)
+            soc_sum += c.battery_soc
+            data_count += 1
+
         # Guard against empty or invalid coordinators
-        coordinators_with_data = [c for c in self.coordinators if c.data]
-        if not coordinators_with_data:
+        if data_count == 0:
             _LOGGER.error("No battery coordinators with valid data for predictive charging evaluation")
             return {
                 "should_charge": False,
@@ -899,8 +1208,7 @@ class ChargeDischargeController:
             }
 
         # === STEP 3: Calculate Energy Balance ===
-        # Get battery configuration
-        total_capacity_kwh = sum(c.data.get("battery_total_energy", 0) for c in coordinators_with_data)
+        # Validate battery configuration
         if total_capacity_kwh <= 0:
             _LOGGER.error(
                 "Invalid total battery capacity (%.2f kWh) - cannot evaluate predictive charging",
@@ -921,11 +1229,7 @@ class ChargeDischargeController:
                 "days_in_history": 0,
                 "reason": f"Invalid battery capacity: {total_capacity_kwh:.2f} kWh"
             }
-        avg_soc = sum(c.data.get("battery_soc", 0) for c in coordinators_with_data) / len(coordinators_with_data)
-
-        # Get min_soc from coordinators (use max if mixed configs for safety)
-        min_soc_values = [c.min_soc for c in self.coordinators]
-        min_soc = max(min_soc_values) if min_soc_values else 20  # Default 20% if unavailable
+        avg_soc = soc_sum / data_count
 
         # Calculate energy components
         stored_energy_kwh = (avg_soc / 100) * total_capacity_kwh
@@ -940,7 +1244,8 @@ class ChargeDischargeController:
 
         # === STEP 4: Get Solar Forecast ===
         forecast_state = self.hass.states.get(self.solar_forecast_sensor)
-        if forecast_state is None or forecast_state.state in ("unknown", "unavailable"):
+        forecast_raw = forecast_state.state if forecast_state is not None else None
+        if forecast_raw is None or forecast_raw in _INVALID_STATES:
             # Conservative mode: assume zero solar, compare usable vs consumption
             total_available_kwh = usable_energy_kwh
             energy_deficit_kwh = avg_consumption_kwh - total_available_kwh
@@ -974,7 +1279,7 @@ class ChargeDischargeController:
             }
 
         try:
-            solar_forecast_kwh = float(forecast_state.state)
+            solar_forecast_kwh = float(forecast_raw)
         except (ValueError, TypeError):
             # Treat invalid as unavailable - use same conservative logic
             total_available_kwh = usable_energy_kwh
@@ -986,7 +1291,7 @@ class ChargeDischargeController:
                 "  Battery: %.2f kWh usable\n"
                 "  Consumption: %.2f kWh expected\n"
                 "  → Decision: %s",
-                forecast_state.state,
+                forecast_raw,
                 usable_energy_kwh,
                 avg_consumption_kwh,
                 "ACTIVATE CHARGING" if should_charge else "NO CHARGING NEEDED"
@@ -1013,29 +1318,30 @@ class ChargeDischargeController:
         energy_deficit_kwh = avg_consumption_kwh - total_available_kwh
         should_charge = energy_deficit_kwh > 0
 
-        _LOGGER.info(
-            "Predictive Grid Charging Evaluation (Energy Balance):\n"
-            "  Battery Status:\n"
-            "    - Total capacity: %.2f kWh\n"
-            "    - Current SOC: %.1f%% (%.2f kWh stored)\n"
-            "    - Discharge cutoff: %.1f%% (%.2f kWh locked)\n"
-            "    - Usable reserve: %.2f kWh (above cutoff)\n"
-            "  Energy Balance:\n"
-            "    - Solar forecast: %.2f kWh\n"
-            "    - Consumption forecast: %.2f kWh (%d-day avg)\n"
-            "    - Total available: %.2f kWh (usable + solar)\n"
-            "    - Energy deficit: %.2f kWh\n"
-            "  → Decision: %s",
-            total_capacity_kwh,
-            avg_soc, stored_energy_kwh,
-            min_soc, cutoff_energy_kwh,
-            usable_energy_kwh,
-            solar_forecast_kwh,
-            avg_consumption_kwh, days_in_history,
-            total_available_kwh,
-            energy_deficit_kwh,
-            "ACTIVATE CHARGING" if should_charge else "NO CHARGING NEEDED"
-        )
+        if _LOGGER.isEnabledFor(logging.INFO):
+            _LOGGER.info(
+                "Predictive Grid Charging Evaluation (Energy Balance):\n"
+                "  Battery Status:\n"
+                "    - Total capacity: %.2f kWh\n"
+                "    - Current SOC: %.1f%% (%.2f kWh stored)\n"
+                "    - Discharge cutoff: %.1f%% (%.2f kWh locked)\n"
+                "    - Usable reserve: %.2f kWh (above cutoff)\n"
+                "  Energy Balance:\n"
+                "    - Solar forecast: %.2f kWh\n"
+                "    - Consumption forecast: %.2f kWh (%d-day avg)\n"
+                "    - Total available: %.2f kWh (usable + solar)\n"
+                "    - Energy deficit: %.2f kWh\n"
+                "  → Decision: %s",
+                total_capacity_kwh,
+                avg_soc, stored_energy_kwh,
+                min_soc, cutoff_energy_kwh,
+                usable_energy_kwh,
+                solar_forecast_kwh,
+                avg_consumption_kwh, days_in_history,
+                total_available_kwh,
+                energy_deficit_kwh,
+                "ACTIVATE CHARGING" if should_charge else "NO CHARGING NEEDED"
+            )
 
         # === STEP 7: Return Complete Decision Data ===
         return {
@@ -1060,24 +1366,20 @@ class ChargeDischargeController:
             )
         }
 
-    def _check_time_window(self) -> bool:
+    def _check_time_window(self, now: datetime | None = None) -> bool:
         """Helper to check if we're in the time window (without override check)."""
-        from datetime import datetime, time as dt_time
-        
-        now = datetime.now()
+        now = now or dt_util.now()
         current_time = now.time()
-        current_day = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"][now.weekday()]
+        current_day = _WEEKDAYS[now.weekday()]
         
         # Check day
-        if current_day not in self.charging_time_slot["days"]:
+        if current_day not in self._charging_slot_days:
             return False
         
-        # Check time
-        try:
-            start_time = dt_time.fromisoformat(self.charging_time_slot["start_time"])
-            end_time = dt_time.fromisoformat(self.charging_time_slot["end_time"])
-        except Exception as e:
-            _LOGGER.error("Error parsing predictive charging time slot: %s", e)
+        # Check time (slot times are parsed once at startup)
+        start_time = self._charging_slot_start
+        end_time = self._charging_slot_end
+        if start_time is None:
             return False
         
         # Handle overnight slots
@@ -1086,7 +1388,7 @@ class ChargeDischargeController:
         else:
             return current_time >= start_time or current_time <= end_time
     
-    def _is_in_pre_evaluation_window(self) -> bool:
+    def _is_in_pre_evaluation_window(self, now: datetime | None = None) -> bool:
         """Check if we're 1 hour before the charging slot starts (for early evaluation).
 
         This method checks the NEXT occurrence of the configured start_time (either today or tomorrow)
@@ -1096,71 +1398,69 @@ class ChargeDischargeController:
         - Current time is within 60±5 minutes before a slot start time
         - The day the slot will start on is in configured days
         """
-        from datetime import datetime, time as dt_time, timedelta
-
-        now = datetime.now()
-
-        try:
-            start_time = dt_time.fromisoformat(self.charging_time_slot["start_time"])
-        except Exception as e:
-            _LOGGER.error("Error parsing predictive charging time slot: %s", e)
+        start_time = self._charging_slot_start
+        if start_time is None:
             return False
 
-        # Check both today's and tomorrow's potential slots
-        # This handles all cases including midnight boundary crossings
-        for days_ahead in [0, 1]:
-            slot_date = now.date() + timedelta(days=days_ahead)
-            slot_datetime = datetime.combine(slot_date, start_time)
+        now = now or dt_util.now()
 
-            # Skip if this slot is in the past
-            if slot_datetime <= now:
-                continue
-
-            # Calculate pre-eval time (1 hour before slot)
-            pre_eval_target = slot_datetime - timedelta(minutes=60)
-
-            # Check if we're within ±5 minutes of pre-eval target (10-minute window)
-            time_diff_seconds = abs((now - pre_eval_target).total_seconds())
-            time_diff_minutes = time_diff_seconds / 60
-
-            # INFO LOG: Show timing calculation for slots that aren't in the past
+        # Seconds until the NEXT occurrence of the slot start (today, or tomorrow if already past)
+        # This handles all cases including midnight boundary crossings
+        start_seconds = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+        now_seconds = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1_000_000
+        seconds_until_slot = start_seconds - now_seconds
+        days_ahead = 0
+        if seconds_until_slot <= 0:
+            seconds_until_slot += 86400
+            days_ahead = 1
+
+        # Check if we're within ±5 minutes of pre-eval target (1 hour before slot, 10-minute window)
+        offset_seconds = seconds_until_slot - _PRE_EVAL_LEAD_SECONDS
+        log_info = _LOGGER.isEnabledFor(logging.INFO)
+
+        if log_info:
+            # INFO LOG: Show timing calculation for the next slot
+            slot_datetime = datetime.combine(now.date() + timedelta(days=days_ahead), start_time)
+            pre_eval_target = slot_datetime - timedelta(seconds=_PRE_EVAL_LEAD_SECONDS)
             _LOGGER.info(
                 "Pre-eval check: now=%s, slot=%s, pre_eval_target=%s, time_diff=%.1f min, threshold=±5 min",
                 now.strftime("%a %H:%M"),
                 slot_datetime.strftime("%a %H:%M"),
                 pre_eval_target.strftime("%a %H:%M"),
-                time_diff_minutes
+                abs(offset_seconds) / 60
             )
 
-            if time_diff_seconds <= 5 * 60:
-                # We're in the pre-eval window for this slot
-                # Check if the slot's day is configured
-                slot_day = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"][slot_datetime.weekday()]
+        if not -_PRE_EVAL_TOLERANCE_SECONDS <= offset_seconds <= _PRE_EVAL_TOLERANCE_SECONDS:
+            # No pre-eval window found
+            return False
 
-                # INFO LOG: Show day matching logic
-                _LOGGER.info(
-                    "Pre-eval WINDOW DETECTED: slot_day=%s, configured_days=%s, match=%s",
-                    slot_day.upper(),
-                    self.charging_time_slot["days"],
-                    slot_day in self.charging_time_slot["days"]
-                )
+        # We're in the pre-eval window for this slot
+        # Check if the slot's day is configured
+        slot_day = _WEEKDAYS[(now.weekday() + days_ahead) % 7]
+        in_configured_days = slot_day in self._charging_slot_days
 
-                if slot_day in self.charging_time_slot["days"]:
-                    _LOGGER.info(
-                        "✓ PRE-EVALUATION WINDOW ACTIVE: slot starts at %s (%s), current time=%s",
-                        slot_datetime.strftime("%a %H:%M"),
-                        slot_day.upper(),
-                        now.strftime("%a %H:%M")
-                    )
-                    return True
-                else:
-                    _LOGGER.info(
-                        "✗ Pre-eval window detected but slot day %s NOT in configured days - skipping",
-                        slot_day.upper()
-                    )
-                    return False
+        if log_info:
+            # INFO LOG: Show day matching logic
+            _LOGGER.info(
+                "Pre-eval WINDOW DETECTED: slot_day=%s, configured_days=%s, match=%s",
+                slot_day.upper(),
+                self.charging_time_slot["days"],
+                in_configured_days
+            )
+
+        if in_configured_days:
+            _LOGGER.info(
+                "✓ PRE-EVALUATION WINDOW ACTIVE: slot starts at %s %s, current time=%s",
+                slot_day.upper(),
+                start_time.strftime("%H:%M"),
+                now.strftime("%a %H:%M")
+            )
+            return True
 
-        # No pre-eval window found
+        _LOGGER.info(
+            "✗ Pre-eval window detected but slot day %s NOT in configured days - skipping",
+            slot_day.upper()
+        )
         return False
 
     def _is_in_predictive_charging_slot(self) -> bool:
@@ -1174,40 +1474,52 @@ class ChargeDischargeController:
         
         return self._check_time_window()
 
-    async def _handle_predictive_grid_charging(self):
+    async def _handle_predictive_grid_charging(self, weekly_charge_active: bool):
         """
         Handle predictive grid charging mode.
 
         Target: Keep consumption/export sensor at max_contracted_power.
         If home consumption increases, reduce battery charging to avoid exceeding ICP.
         """
-        consumption_state = self.hass.states.get(self.consumption_sensor)
+        consumption_state = self._consumption_state
         if consumption_state is None:
             _LOGGER.warning("Consumption sensor unavailable during predictive charging")
             return
         
-        try:
-            sensor_raw = float(consumption_state.state)
-        except (ValueError, TypeError):
+        sensor_raw = self._consumption_value
+        if sensor_raw is None:
             _LOGGER.warning("Invalid consumption sensor state: %s", consumption_state.state)
             return
         
         # Apply sensor filtering
-        self.sensor_history.append(sensor_raw)
-        if len(self.sensor_history) > self.sensor_history_size:
-            self.sensor_history.pop(0)
-        sensor_filtered = sum(self.sensor_history) / len(self.sensor_history)
+        sensor_filtered = self._filter_sensor(sensor_raw)
         
         # Get available batteries (respecting max_soc)
-        available_batteries = self._get_available_batteries(is_charging=True)
+        available_batteries = self._get_available_batteries(True, weekly_charge_active)
         if not available_batteries:
             _LOGGER.info("Predictive charging: No batteries available (all at max_soc)")
-            for coordinator in self.coordinators:
-                await self._set_battery_power(coordinator, 0, 0)
+            await self._apply_power_allocation({}, is_charging=True)
+            return
+
+        # Grid draw within deadband of the target with the same batteries charging:
+        # hold the current setpoints instead of rewriting them over Modbus
+        if (
+            self._grid_charging_initialized
+            and abs(self.max_contracted_power - sensor_filtered) < self.deadband
+            and self._allocated_batteries == frozenset(available_batteries)
+        ):
+            if self._dbg:
+                _LOGGER.debug("Predictive: Grid %.1fW within deadband ±%dW of target, holding charge",
+                              sensor_filtered, self.deadband)
+            self.previous_sensor = sensor_filtered
             return
         
-        # Calculate max available charging power from batteries
-        max_battery_charge = sum(c.max_charge_power for c in available_batteries)
+        # Calculate max available charging power from batteries (limits reused for distribution)
+        limits = {}
+        max_battery_charge = 0
+        for c in available_batteries:
+            limits[c] = c.max_charge_power
+            max_battery_charge += c.max_charge_power
         
         # TARGET: max_contracted_power (e.g., 7000W)
         # ERROR: target - sensor_actual (INVERTED for predictive mode)
@@ -1227,8 +1539,11 @@ class ChargeDischargeController:
             _LOGGER.info("Initialized predictive charging: target=%dW, initial_charge=%dW",
                         target_power, abs(self.previous_power))
         
+        # Controller state read several times below; bound once per cycle
+        previous_power = self.previous_power
+
         # Calculate derivative
-        error_derivative = (error - self.previous_error) / self.dt
+        error_derivative = (error - self.previous_error) / self._cycle_dt
         
         # PD terms
         P = self.kp * error
@@ -1238,15 +1553,14 @@ class ChargeDischargeController:
         # Calculate new charging power (incremental)
         # If error > 0 (importing too little) -> increase charging (adjustment is positive -> previous_power becomes more negative)
         # If error < 0 (importing too much) -> reduce charging (adjustment is negative -> previous_power becomes less negative)
-        new_power_raw = self.previous_power - pd_adjustment
+        new_power_raw = previous_power - pd_adjustment
         
         # Apply rate limiter
-        power_change = new_power_raw - self.previous_power
+        power_change = new_power_raw - previous_power
         if abs(power_change) > self.max_power_change_per_cycle:
-            sign = 1 if power_change > 0 else -1
-            new_power = self.previous_power + (sign * self.max_power_change_per_cycle)
+            new_power = previous_power + math.copysign(self.max_power_change_per_cycle, power_change)
             _LOGGER.info("Predictive: Rate limiter active (change: %.1fW → %.1fW)",
-                        power_change, new_power - self.previous_power)
+                        power_change, new_power - previous_power)
         else:
             new_power = new_power_raw
         
@@ -1259,86 +1573,115 @@ class ChargeDischargeController:
             _LOGGER.warning("Predictive: Negative power detected (discharge), clamping to 0W")
             new_power = 0
         
-        _LOGGER.info(
-            "Predictive Grid Charging: Grid=%.1fW, Target=%dW, Error=%.1fW, P=%.1fW, D=%.1fW, "
-            "Adjustment=%.1fW, PrevPower=%.1fW, NewCharge=%dW",
-            sensor_filtered, target_power, error, P, D, pd_adjustment, self.previous_power, abs(new_power)
-        )
+        log_info = _LOGGER.isEnabledFor(logging.INFO)
+        if log_info:
+            _LOGGER.info(
+                "Predictive Grid Charging: Grid=%.1fW, Target=%dW, Error=%.1fW, P=%.1fW, D=%.1fW, "
+                "Adjustment=%.1fW, PrevPower=%.1fW, NewCharge=%dW",
+                sensor_filtered, target_power, error, P, D, pd_adjustment, previous_power, abs(new_power)
+            )
 
         # Distribute power respecting individual battery limits
-        power_allocation = self._distribute_power_by_limits(abs(new_power), available_batteries, is_charging=True)
+        power_allocation = self._distribute_power_by_limits(
+            abs(new_power), available_batteries, is_charging=True, limits=limits
+        )
 
-        total_allocated = sum(power_allocation.values())
-        _LOGGER.info("Predictive: Setting charge to %dW total across %d batteries: %s",
-                    total_allocated, len(available_batteries),
-                    {c.name: p for c, p in power_allocation.items()})
+        if log_info:
+            _LOGGER.info("Predictive: Setting charge to %dW total across %d batteries: %s",
+                        sum(power_allocation.values()), len(available_batteries),
+                        {c.name: p for c, p in power_allocation.items()})
 
-        # Write to batteries
-        for coordinator in available_batteries:
-            await self._set_battery_power(coordinator, power_allocation.get(coordinator, 0), 0)
-        
-        # Set unavailable batteries to 0
-        for coordinator in self.coordinators:
-            if coordinator not in available_batteries:
-                await self._set_battery_power(coordinator, 0, 0)
+        # Write to batteries (unavailable batteries are set to 0)
+        await self._apply_power_allocation(power_allocation, is_charging=True)
         
         # Update state
         self.previous_power = new_power
         self.previous_error = error
         self.previous_sensor = sensor_filtered
 
-    def _distribute_power_by_limits(self, total_power: float, available_batteries: list, is_charging: bool) -> dict:
+    def _distribute_power_by_limits(
+        self, total_power: float, available_batteries: list, is_charging: bool, limits: dict | None = None
+    ) -> dict:
         """Distribute power among batteries proportionally to their individual limits.
 
+        `limits` may be passed in by callers that already collected each battery's limit.
+
         Returns dict mapping coordinator -> power (int, rounded to 5W).
         """
         if not available_batteries:
             return {}
 
-        # Get each battery's individual limit
-        limits = {}
-        for c in available_batteries:
-            limits[c] = c.max_charge_power if is_charging else c.max_discharge_power
+        # Single battery (the common install): it simply gets the request capped at its limit
+        if len(available_batteries) == 1:
+            c = available_batteries[0]
+            if limits is not None:
+                limit = limits[c]
+            else:
+                limit = c.max_charge_power if is_charging else c.max_discharge_power
+            power = min(total_power, limit)
+            return {c: self._round_to_5w(power) if power > 0 else 0}
+
+        # Get each battery's individual limit, in available_batteries order
+        if limits is None:
+            if is_charging:
+                caps = [c.max_charge_power for c in available_batteries]
+            else:
+                caps = [c.max_discharge_power for c in available_batteries]
+        else:
+            caps = [limits[c] for c in available_batteries]
 
-        total_capacity = sum(limits.values())
+        total_capacity = sum(caps)
         if total_capacity <= 0:
-            return {c: 0 for c in available_batteries}
+            return dict.fromkeys(available_batteries, 0)
 
         # Clamp total request to total capacity
         remaining_power = min(total_power, total_capacity)
+        if remaining_power <= 0:
+            return dict.fromkeys(available_batteries, 0)
 
-        allocation = {}
-        remaining_batteries = list(available_batteries)
-
-        # Iterative allocation: distribute proportionally, cap at limits, redistribute excess
-        while remaining_power > 0 and remaining_batteries:
-            current_capacity = sum(limits[c] for c in remaining_batteries)
-            if current_capacity <= 0:
-                break
-
-            all_fit = True
-            for c in list(remaining_batteries):
-                share = remaining_power * (limits[c] / current_capacity)
-                if share >= limits[c]:
-                    # This battery is at its limit
-                    allocation[c] = self._round_to_5w(limits[c])
-                    remaining_power -= limits[c]
-                    remaining_batteries.remove(c)
-                    all_fit = False
-
-            if all_fit:
-                # All remaining batteries can handle their proportional share
-                for c in remaining_batteries:
-                    share = remaining_power * (limits[c] / current_capacity)
-                    allocation[c] = self._round_to_5w(share)
-                break
-
-        # Ensure all batteries have an entry
-        for c in available_batteries:
-            if c not in allocation:
-                allocation[c] = 0
+        # Proportional shares never exceed a battery's limit once the request is
+        # clamped to the total capacity, so no capping/redistribution pass is needed
+        # Round to 5W granularity inline (same as _round_to_5w)
+        return {
+            c: round(remaining_power * (cap / total_capacity) / 5) * 5
+            for c, cap in zip(available_batteries, caps)
+        }
+
+    async def _apply_power_allocation(self, power_allocation: dict, is_charging: bool) -> None:
+        """Write a power allocation to every battery concurrently.
 
-        return allocation
+        Batteries missing from the allocation are set to 0. Each battery has its
+        own Modbus connection, so the writes overlap instead of queuing. An idle
+        (all-zero) allocation that every battery already acknowledged is only
+        re-sent every _IDLE_REASSERT_SECONDS.
+        """
+        idle = not any(power_allocation.values())
+        if (
+            idle
+            and self._idle_confirmed_at is not None
+            and time.monotonic() - self._idle_confirmed_at < _IDLE_REASSERT_SECONDS
+        ):
+            # Every battery already acknowledged a zero command; skip the Modbus round trips
+            self._allocated_batteries = frozenset(power_allocation)
+            return
+
+        writes = []
+        for coordinator in self.coordinators:
+            power = power_allocation.get(coordinator, 0)
+            if is_charging:
+                writes.append(self._set_battery_power(coordinator, power, 0))
+            else:
+                writes.append(self._set_battery_power(coordinator, 0, power))
+        self._allocated_batteries = frozenset(power_allocation)
+        results = await asyncio.gather(*writes, return_exceptions=True)
+        # One battery failing must not stop the others from receiving their setpoints
+        for coordinator, result in zip(self.coordinators, results):
+            if isinstance(result, Exception):
+                _LOGGER.error("[%s] Failed to set battery power: %s", coordinator.name, result)
+        # Remember a fully acknowledged idle command so steady idle ticks can skip rewriting it
+        self._idle_confirmed_at = (
+            time.monotonic() if idle and all(result is True for result in results) else None
+        )
 
     async def _set_battery_power(
         self,
@@ -1358,21 +1701,39 @@ class ChargeDischargeController:
         else:
             expected_force_mode = 0  # None
 
-        # Attempt write + verify, with one retry on failure
-        for attempt in range(2):
-            # Get version-specific registers
-            charge_power_reg = coordinator.get_register("set_charge_power")
-            discharge_power_reg = coordinator.get_register("set_discharge_power")
-            force_mode_reg = coordinator.get_register("force_mode")
+        # Get version-specific registers (invariant across retries)
+        charge_power_reg = coordinator.get_register("set_charge_power")
+        discharge_power_reg = coordinator.get_register("set_discharge_power")
+        force_mode_reg = coordinator.get_register("force_mode")
 
-            if None in [charge_power_reg, discharge_power_reg, force_mode_reg]:
-                _LOGGER.error("%s: Cannot write power commands - missing registers", coordinator.name)
-                return
+        if charge_power_reg is None or discharge_power_reg is None or force_mode_reg is None:
+            _LOGGER.error("%s: Cannot write power commands - missing registers", coordinator.name)
+            return
 
+        # Registers hold unsigned whole watts; cast and clamp once for both the writes
+        # and the ACK check, so an out-of-range value can't fail every attempt
+        charge_power_i = max(0, min(int(charge_power), 0xFFFF))
+        discharge_power_i = max(0, min(int(discharge_power), 0xFFFF))
+        if charge_power_i != int(charge_power) or discharge_power_i != int(discharge_power):
+            _LOGGER.warning(
+                "[%s] Power setpoint out of register range (charge=%s, discharge=%s), clamping",
+                coordinator.name, charge_power, discharge_power
+            )
+        charge_power = charge_power_i
+        discharge_power = discharge_power_i
+
+        # Charge and discharge power registers are adjacent on all versions; write them together
+        power_block = discharge_power_reg == charge_power_reg + 1
+
+        # Attempt write + verify, with one retry on failure
+        for attempt in range(2):
             # Write registers
-            await coordinator.write_register(discharge_power_reg, int(discharge_power), do_refresh=False)
-            await asyncio.sleep(0.05)
-            await coordinator.write_register(charge_power_reg, int(charge_power), do_refresh=False)
+            if power_block:
+                await coordinator.write_registers(charge_power_reg, [charge_power, discharge_power])
+            else:
+                await coordinator.write_register(discharge_power_reg, discharge_power, do_refresh=False)
+                await asyncio.sleep(0.05)
+                await coordinator.write_register(charge_power_reg, charge_power, do_refresh=False)
             await asyncio.sleep(0.05)
             await coordinator.write_register(force_mode_reg, expected_force_mode, do_refresh=False)
 
@@ -1391,21 +1752,23 @@ class ChargeDischargeController:
                 continue
 
             # Verify ACK - check if written values match readback
+            fb_force_mode, fb_charge_power, fb_discharge_power = _ACK_FIELDS(feedback)
             ack_ok = (
-                feedback["force_mode"] == expected_force_mode and
-                feedback["set_charge_power"] == int(charge_power) and
-                feedback["set_discharge_power"] == int(discharge_power)
+                fb_force_mode == expected_force_mode and
+                fb_charge_power == charge_power and
+                fb_discharge_power == discharge_power
             )
 
             if ack_ok:
-                _LOGGER.debug(
-                    "[%s] Power command ACK'd: force=%d, charge=%dW, discharge=%dW, actual=%dW",
-                    coordinator.name,
-                    expected_force_mode,
-                    int(charge_power),
-                    int(discharge_power),
-                    feedback["battery_power"]
-                )
+                if self._dbg:
+                    _LOGGER.debug(
+                        "[%s] Power command ACK'd: force=%d, charge=%dW, discharge=%dW, actual=%dW",
+                        coordinator.name,
+                        expected_force_mode,
+                        charge_power,
+                        discharge_power,
+                        feedback["battery_power"]
+                    )
                 return True
 
             if attempt == 0:
@@ -1414,7 +1777,7 @@ class ChargeDischargeController:
                     "Expected force=%d, got=%d",
                     coordinator.name,
                     expected_force_mode,
-                    feedback["force_mode"]
+                    fb_force_mode
                 )
 
         if not coordinator._is_shutting_down:
@@ -1438,35 +1801,39 @@ class ChargeDischargeController:
         Positive = reduce battery discharge
         Negative = increase battery discharge
         """
-        excluded_devices = self.config_entry.data.get("excluded_devices", [])
-        if not excluded_devices:
+        if not self._excluded_devices:
             return 0.0
         
         total_adjustment = 0.0
-        for device in excluded_devices:
-            power_sensor = device.get("power_sensor")
-            if not power_sensor:
-                continue
-            
-            state = self.hass.states.get(power_sensor)
-            if state is None or state.state in ("unknown", "unavailable"):
-                _LOGGER.debug("Excluded device sensor %s not available", power_sensor)
+        states_get = self.hass.states.get
+        for power_sensor, included_in_consumption in self._excluded_devices:
+            state = states_get(power_sensor)
+            if state is None or state.state in _INVALID_STATES:
+                if self._dbg:
+                    _LOGGER.debug("Excluded device sensor %s not available", power_sensor)
                 continue
             
             try:
-                device_power = float(state.state)
-                included_in_consumption = device.get("included_in_consumption", True)
+                # State objects are replaced on every change, so identity means "same reading"
+                cached = self._excluded_device_values.get(power_sensor)
+                if cached is not None and cached[0] is state:
+                    device_power = cached[1]
+                else:
+                    device_power = float(state.state)
+                    self._excluded_device_values[power_sensor] = (state, device_power)
                 
                 if included_in_consumption:
                     # Device IS in home sensor → SUBTRACT (don't power from battery)
                     total_adjustment += device_power
-                    _LOGGER.debug("Excluded device %s consuming %.1fW (included in consumption, SUBTRACTING)", 
-                                power_sensor, device_power)
+                    if self._dbg:
+                        _LOGGER.debug("Excluded device %s consuming %.1fW (included in consumption, SUBTRACTING)", 
+                                    power_sensor, device_power)
                 else:
                     # Device is NOT in home sensor → ADD (power from battery)
                     total_adjustment -= device_power
-                    _LOGGER.debug("Additional device %s consuming %.1fW (NOT in consumption, ADDING)", 
-                                power_sensor, device_power)
+                    if self._dbg:
+                        _LOGGER.debug("Additional device %s consuming %.1fW (NOT in consumption, ADDING)", 
+                                    power_sensor, device_power)
             except (ValueError, TypeError):
                 _LOGGER.warning("Could not parse device sensor %s: %s", power_sensor, state.state)
         
@@ -1486,21 +1853,21 @@ class ChargeDischargeController:
         Returns:
             tuple: (title, message)
         """
-        from datetime import time as dt_time
-
         # Extract NEW field names from refactored energy balance decision
-        should_charge = decision_data["should_charge"]
-        solar_forecast = decision_data["solar_forecast_kwh"]
-        stored_energy = decision_data["stored_energy_kwh"]
-        usable_energy = decision_data["usable_energy_kwh"]
-        min_reserve = decision_data["min_reserve_kwh"]
-        effective_min_soc = decision_data["effective_min_soc"]
-        avg_soc = decision_data["avg_soc"]
-        avg_consumption = decision_data["avg_consumption_kwh"]
-        total_available = decision_data["total_available_kwh"]
-        energy_deficit = decision_data["energy_deficit_kwh"]
-        days_in_history = decision_data["days_in_history"]
-        reason = decision_data["reason"]
+        (
+            should_charge,
+            solar_forecast,
+            stored_energy,
+            usable_energy,
+            min_reserve,
+            effective_min_soc,
+            avg_soc,
+            avg_consumption,
+            total_available,
+            energy_deficit,
+            days_in_history,
+            reason,
+        ) = _DECISION_FIELDS(decision_data)
 
         # Format consumption history info
         if days_in_history == 0:
@@ -1508,16 +1875,23 @@ class ChargeDischargeController:
         else:
             consumption_info = f"{avg_consumption:.2f} kWh (7-day avg, {days_in_history} days)"
 
+        # Lines shared by every message variant
+        battery_line = f"Battery: {avg_soc:.0f}% ({usable_energy:.2f} kWh usable)\n"
+        consumption_line = f"Consumption: {consumption_info}\n\n"
+        cutoff_reserve_line = (
+            f"Discharge cutoff: {effective_min_soc:.0f}% | Usable reserve: {min_reserve:.2f} kWh\n"
+        )
+
         # Handle safe mode (forecast unavailable)
         if solar_forecast is None:
             title = "Predictive Charging: NOT activated (safe mode)"
             message = (
                 f"⚠ {reason}\n\n"
-                f"Battery: {avg_soc:.0f}% ({usable_energy:.2f} kWh usable)\n"
-                f"Discharge cutoff: {effective_min_soc:.0f}% | Usable reserve: {min_reserve:.2f} kWh\n"
-                f"Consumption: {consumption_info}\n\n"
-                f"Decision: No solar forecast available\n"
-                f"Conservative mode applied."
+                + battery_line
+                + cutoff_reserve_line
+                + consumption_line
+                + "Decision: No solar forecast available\n"
+                "Conservative mode applied."
             )
             return (title, message)
 
@@ -1527,12 +1901,12 @@ class ChargeDischargeController:
             surplus = total_available - avg_consumption
             title = "Predictive Charging: NOT required"
             message = (
-                f"✓ Sufficient energy available for tomorrow\n\n"
-                f"Battery: {avg_soc:.0f}% ({usable_energy:.2f} kWh usable)\n"
-                f"Discharge cutoff: {effective_min_soc:.0f}%\n"
+                "✓ Sufficient energy available for tomorrow\n\n"
+                + battery_line
+                + f"Discharge cutoff: {effective_min_soc:.0f}%\n"
                 f"Solar tomorrow: {solar_forecast:.2f} kWh\n"
-                f"Consumption: {consumption_info}\n\n"
-                f"Available: {total_available:.2f} kWh\n"
+                + consumption_line
+                + f"Available: {total_available:.2f} kWh\n"
                 f"Needed: {avg_consumption:.2f} kWh\n"
                 f"Surplus: {surplus:.2f} kWh ✓\n\n"
                 f"Batteries will not charge from grid."
@@ -1540,23 +1914,24 @@ class ChargeDischargeController:
         else:
             # Insufficient energy - charging needed
             # Build title based on evaluation type
+            start_str = self._charging_slot_start.strftime("%H:%M") if self._charging_slot_start else None
+            end_str = self._charging_slot_end.strftime("%H:%M") if self._charging_slot_end else None
             if is_pre_evaluation:
-                try:
-                    start_time = dt_time.fromisoformat(self.charging_time_slot["start_time"])
-                    title = f"Predictive Charging ACTIVATED (start: {start_time.strftime('%H:%M')})"
-                except Exception:
+                if start_str is not None:
+                    title = f"Predictive Charging ACTIVATED (start: {start_str})"
+                else:
                     title = "Predictive Charging ACTIVATED"
             else:
                 title = "Predictive Charging STARTED"
 
             # Build message
             message = (
-                f"⚡ Energy balance shows charging needed\n\n"
-                f"Battery: {avg_soc:.0f}% ({usable_energy:.2f} kWh usable)\n"
-                f"Discharge cutoff: {effective_min_soc:.0f}% | Usable reserve: {min_reserve:.2f} kWh\n"
-                f"Solar tomorrow: {solar_forecast:.2f} kWh\n"
-                f"Consumption: {consumption_info}\n\n"
-                f"Available: {total_available:.2f} kWh\n"
+                "⚡ Energy balance shows charging needed\n\n"
+                + battery_line
+                + cutoff_reserve_line
+                + f"Solar tomorrow: {solar_forecast:.2f} kWh\n"
+                + consumption_line
+                + f"Available: {total_available:.2f} kWh\n"
                 f"Needed: {avg_consumption:.2f} kWh\n"
                 f"Deficit: {energy_deficit:.2f} kWh ✗\n\n"
                 f"⚡ Charging will activate to cover shortfall.\n\n"
@@ -1564,20 +1939,15 @@ class ChargeDischargeController:
 
             # Add footer based on evaluation type
             if is_pre_evaluation:
-                try:
-                    start_time = dt_time.fromisoformat(self.charging_time_slot["start_time"])
-                    end_time = dt_time.fromisoformat(self.charging_time_slot["end_time"])
-                    message += f"Charging will start at {start_time.strftime('%H:%M')} (in ~1 hour)\n"
-                    message += f"Charging until: {end_time.strftime('%H:%M')}\n"
-                except Exception:
+                if start_str is not None:
+                    message += f"Charging will start at {start_str} (in ~1 hour)\n"
+                    message += f"Charging until: {end_str}\n"
+                else:
                     message += "Charging will start in ~1 hour\n"
             else:
-                try:
-                    end_time = dt_time.fromisoformat(self.charging_time_slot["end_time"])
-                    message += f"Charging now from grid\n"
-                    message += f"Charging until: {end_time.strftime('%H:%M')}\n"
-                except Exception:
-                    message += "Charging now from grid\n"
+                message += "Charging now from grid\n"
+                if end_str is not None:
+                    message += f"Charging until: {end_str}\n"
 
             message += f"Maximum power: {self.max_contracted_power}W"
 
@@ -1610,12 +1980,23 @@ class ChargeDischargeController:
     
     async def async_update_charge_discharge(self, now=None):
         """Update the charge/discharge power of the batteries."""
-        _LOGGER.debug("ChargeDischargeController: async_update_charge_discharge started.")
+        # Refresh once per cycle so hot-path debug logs can be skipped cheaply
+        self._dbg = _LOGGER.isEnabledFor(logging.DEBUG)
+        # Single local wall-clock reading shared by all time checks in this cycle
+        now = dt_util.as_local(now) if now is not None else dt_util.now()
+        # Real cycle time for the D and I terms (the interval drifts under event loop load),
+        # bounded so a stalled or doubled tick can't blow up the derivative
+        tick = time.monotonic()
+        self._cycle_dt = min(max(tick - self._last_tick, 0.5 * self.dt), 3.0 * self.dt)
+        self._last_tick = tick
+        if self._dbg:
+            _LOGGER.debug("ChargeDischargeController: async_update_charge_discharge started.")
 
         # === MANUAL MODE CHECK (highest priority) ===
         # If manual mode is enabled, skip all automatic control logic
         if self.manual_mode_enabled:
-            _LOGGER.debug("Manual Mode active - skipping automatic control")
+            if self._dbg:
+                _LOGGER.debug("Manual Mode active - skipping automatic control")
             # Do not set batteries to 0 - preserve user's manual settings
             # Do not update PD state - freeze controller state
             return
@@ -1623,24 +2004,27 @@ class ChargeDischargeController:
         # === WEEKLY FULL CHARGE REGISTER MANAGEMENT ===
         # Handle register writes and completion detection BEFORE predictive charging
         # This ensures weekly charge works regardless of active control mode
-        await self._handle_weekly_full_charge_registers()
+        # Evaluated once per cycle and threaded to every battery availability check
+        weekly_charge_active = await self._handle_weekly_full_charge_registers(
+            self._is_weekly_full_charge_active(now)
+        )
 
         # === NEW: Predictive Grid Charging Logic ===
         # Check if we're in PRE-EVALUATION window (1 hour before slot)
         if self.predictive_charging_enabled and self.charging_time_slot is not None:
-            in_pre_eval_window = self._is_in_pre_evaluation_window()
+            in_pre_eval_window = self._is_in_pre_evaluation_window(now)
 
             # INFO LOG: Show pre-eval gate conditions (only when window is active to avoid spam)
             if in_pre_eval_window:
                 _LOGGER.info(
                     "Pre-eval trigger check: window=TRUE, already_evaluated=%s → will_trigger=%s",
-                    hasattr(self, '_pre_evaluated'),
-                    not hasattr(self, '_pre_evaluated')
+                    self._pre_evaluated,
+                    not self._pre_evaluated
                 )
 
-            if in_pre_eval_window and not hasattr(self, '_pre_evaluated'):
+            if in_pre_eval_window and not self._pre_evaluated:
                 # Perform early evaluation 1 hour before slot starts
-                current_avg_soc = sum(c.data.get("battery_soc", 0) for c in self.coordinators if c.data) / len(self.coordinators)
+                current_avg_soc = self._average_soc()
                 _LOGGER.info("PRE-EVALUATION: 1 hour before charging slot (SOC: %.1f%%)", current_avg_soc)
 
                 decision_data = await self._should_activate_grid_charging()
@@ -1664,34 +2048,33 @@ class ChargeDischargeController:
         in_time_window = (
             self.predictive_charging_enabled and
             self.charging_time_slot is not None and
-            self._check_time_window()  # Helper without override check
+            self._check_time_window(now)  # Helper without override check
         )
         
         if in_time_window:
             # Check if override is active
             if self.predictive_charging_overridden:
                 # Override active - stop charging and block discharge
-                _LOGGER.debug("Predictive charging overridden by user - batteries idle")
-                for coordinator in self.coordinators:
-                    await self._set_battery_power(coordinator, 0, 0)
+                if self._dbg:
+                    _LOGGER.debug("Predictive charging overridden by user - batteries idle")
+                await self._apply_power_allocation({}, is_charging=False)
                 return
             
             # Apply pre-evaluation decision if available
-            if hasattr(self, '_pre_eval_decision_data'):
+            if self._pre_eval_decision_data is not None:
                 pre_eval_data = self._pre_eval_decision_data
                 self.grid_charging_active = pre_eval_data["should_charge"]
                 self.last_evaluation_soc = self._pre_eval_soc
                 self._last_decision_data = pre_eval_data
-                delattr(self, '_pre_eval_decision_data')
-                if hasattr(self, '_pre_eval_soc'):
-                    delattr(self, '_pre_eval_soc')
+                self._pre_eval_decision_data = None
+                self._pre_eval_soc = None
                 _LOGGER.info(
                     "Applied pre-evaluation decision at slot start: charging=%s (SOC at pre-eval: %.1f%%)",
                     self.grid_charging_active, self.last_evaluation_soc
                 )
 
             # Check if we need to evaluate/re-evaluate charging decision
-            current_avg_soc = sum(c.data.get("battery_soc", 0) for c in self.coordinators if c.data) / len(self.coordinators)
+            current_avg_soc = self._average_soc()
 
             # Evaluate if: first time entering slot (no pre-evaluation) OR significant SOC drop
             should_reevaluate = (
@@ -1726,12 +2109,11 @@ class ChargeDischargeController:
                 # PREDICTIVE CHARGING MODE ACTIVE
                 _LOGGER.info("Predictive Grid Charging ACTIVE - target power: %dW", 
                             self.max_contracted_power)
-                return await self._handle_predictive_grid_charging()
+                return await self._handle_predictive_grid_charging(weekly_charge_active)
             else:
                 # In charging slot but condition not met - block discharge only
                 _LOGGER.info("In predictive charging slot but condition NOT met - blocking discharge")
-                for coordinator in self.coordinators:
-                    await self._set_battery_power(coordinator, 0, 0)
+                await self._apply_power_allocation({}, is_charging=False)
                 return
         else:
             # Not in time window - reset state if exiting
@@ -1756,37 +2138,32 @@ class ChargeDischargeController:
                 self.predictive_charging_overridden = False
 
             # Reset pre-evaluation flag ONLY if we're past the pre-eval window
-            # This prevents the flag from being deleted during pre-eval on days not in the slot
+            # This prevents the flag from being cleared during pre-eval on days not in the slot
             # (e.g., Sunday 23:00 pre-eval for Monday 00:00 slot when Sunday is not configured)
-            if hasattr(self, '_pre_evaluated') and not in_pre_eval_window:
-                delattr(self, '_pre_evaluated')
+            if self._pre_evaluated and not in_pre_eval_window:
+                self._pre_evaluated = False
                 _LOGGER.info("Predictive charging flags reset (exited time window and pre-eval window)")
 
         # === Continue with normal PD control ===
-        consumption_state = self.hass.states.get(self.consumption_sensor)
+        consumption_state = self._consumption_state
         if consumption_state is None:
             _LOGGER.warning(f"Consumption sensor {self.consumption_sensor} not found.")
             return
 
-        try:
-            sensor_raw = float(consumption_state.state)
-        except (ValueError, TypeError):
+        sensor_raw = self._consumption_value
+        if sensor_raw is None:
             _LOGGER.warning(f"Could not parse consumption sensor state: {consumption_state.state}")
             return
         
-        # Add to sensor history for moving average filter
-        self.sensor_history.append(sensor_raw)
-        if len(self.sensor_history) > self.sensor_history_size:
-            self.sensor_history.pop(0)  # Remove oldest
-        
-        # Use moving average to smooth out instantaneous spikes
-        sensor_filtered = sum(self.sensor_history) / len(self.sensor_history)
+        # Add to sensor history and use moving average to smooth out instantaneous spikes
+        sensor_filtered = self._filter_sensor(sensor_raw)
         
         # CRITICAL: Check deadband on FILTERED sensor (actual grid balance) BEFORE compensation
         # This is the real grid import/export that we want to keep near 0
         if abs(sensor_filtered) < self.deadband:
-            _LOGGER.debug("ChargeDischargeController: Filtered sensor %.1fW is within deadband ±%dW, no action taken.",
-                          sensor_filtered, self.deadband)
+            if self._dbg:
+                _LOGGER.debug("ChargeDischargeController: Filtered sensor %.1fW is within deadband ±%dW, no action taken.",
+                              sensor_filtered, self.deadband)
             
             # Reset integral when within deadband to prevent accumulation (only if Ki > 0)
             if self.ki > 0 and self.error_integral != 0.0:
@@ -1802,26 +2179,28 @@ class ChargeDischargeController:
         # Use filtered sensor directly - it shows the real grid imbalance we need to correct
         sensor_actual = sensor_filtered
         
-        if len(self.sensor_history) >= self.sensor_history_size:
+        if self._dbg and len(self.sensor_history) >= self.sensor_history_size:
             _LOGGER.debug("Sensor ready: raw=%.1fW, filtered=%.1fW", sensor_raw, sensor_filtered)
         
         # Adjust for excluded/additional devices
         # Positive adjustment = reduce battery discharge (excluded devices)
         # Negative adjustment = increase battery discharge (additional devices not in home sensor)
-        excluded_adjustment = self._calculate_excluded_devices_adjustment()
-        if excluded_adjustment != 0:
-            if excluded_adjustment > 0:
-                _LOGGER.info("Reducing battery demand by %.1fW (excluded devices)", excluded_adjustment)
-            else:
-                _LOGGER.info("Increasing battery demand by %.1fW (additional devices)", abs(excluded_adjustment))
-            sensor_actual -= excluded_adjustment
+        if self._excluded_devices:
+            excluded_adjustment = self._calculate_excluded_devices_adjustment()
+            if excluded_adjustment != 0:
+                if excluded_adjustment > 0:
+                    _LOGGER.info("Reducing battery demand by %.1fW (excluded devices)", excluded_adjustment)
+                else:
+                    _LOGGER.info("Increasing battery demand by %.1fW (additional devices)", abs(excluded_adjustment))
+                sensor_actual -= excluded_adjustment
 
         if len(self.coordinators) == 0:
             _LOGGER.debug("ChargeDischargeController: No batteries configured.")
             return
 
-        _LOGGER.debug("ChargeDischargeController: sensor_actual=%fW, previous_sensor=%s, previous_power=%fW",
-                      sensor_actual, self.previous_sensor, self.previous_power)
+        if self._dbg:
+            _LOGGER.debug("ChargeDischargeController: sensor_actual=%fW, previous_sensor=%s, previous_power=%fW",
+                          sensor_actual, self.previous_sensor, self.previous_power)
 
         # FIRST EXECUTION: Initialize with sensor reading
         if self.first_execution:
@@ -1833,7 +2212,7 @@ class ChargeDischargeController:
             
             # Get available batteries and set initial power
             is_charging = self.previous_power > 0
-            available_batteries = self._get_available_batteries(is_charging)
+            available_batteries = self._get_available_batteries(is_charging, weekly_charge_active)
             
             if not available_batteries:
                 _LOGGER.debug("ChargeDischargeController: No available batteries for initial setup.")
@@ -1847,22 +2226,13 @@ class ChargeDischargeController:
                         total_allocated, len(available_batteries),
                         {c.name: p for c, p in power_allocation.items()})
 
-            for coordinator in available_batteries:
-                power = power_allocation.get(coordinator, 0)
-                if is_charging:
-                    await self._set_battery_power(coordinator, power, 0)
-                else:
-                    await self._set_battery_power(coordinator, 0, power)
-            
-            # Set remaining batteries (over capacity) to 0
-            for coordinator in self.coordinators:
-                if coordinator not in available_batteries:
-                    await self._set_battery_power(coordinator, 0, 0)
+            # Remaining batteries (over capacity) are set to 0
+            await self._apply_power_allocation(power_allocation, is_charging)
             
             # Reset PD state for clean start (CRITICAL: clear saturated integral)
             self.error_integral = 0.0
             self.previous_error = -sensor_actual
-            self.last_output_sign = 1 if self.previous_power > 0 else (-1 if self.previous_power < 0 else 0)
+            self.last_output_sign = (self.previous_power > 0) - (self.previous_power < 0)
             self.sign_changes = 0
             _LOGGER.info("PD state initialized: previous_error=%.1fW, last_output_sign=%d, integral=0 (cleared)", 
                         self.previous_error, self.last_output_sign)
@@ -1871,8 +2241,9 @@ class ChargeDischargeController:
 
         # SUBSEQUENT EXECUTIONS: Continue with PD control
         # Deadband was already checked on filtered sensor before compensation
-        _LOGGER.debug("ChargeDischargeController: sensor_actual=%fW, UPDATING BATTERIES!",
-                      sensor_actual)
+        if self._dbg:
+            _LOGGER.debug("ChargeDischargeController: sensor_actual=%fW, UPDATING BATTERIES!",
+                          sensor_actual)
         
         # PD CONTROLLER: Calculate adjustment based on grid imbalance
         # Positive sensor = importing from grid → need to reduce battery consumption (discharge more or charge less)
@@ -1887,48 +2258,27 @@ class ChargeDischargeController:
             # DIRECTIONAL RESET: If integral is working AGAINST the current error, it's obsolete
             # Example: integral is positive (wants to charge) but error is negative (should discharge)
             # This means the integral accumulated from old conditions and must be cleared
-            integral_sign = 1 if self.error_integral > 0 else (-1 if self.error_integral < 0 else 0)
-            error_sign = 1 if error > 0 else (-1 if error < 0 else 0)
-            
-            if integral_sign != 0 and error_sign != 0 and integral_sign != error_sign:
+            if self.error_integral * error < 0.0:
                 # Integral and error have opposite signs - integral is working against the error
                 _LOGGER.error("PID DIRECTIONAL CONFLICT: Integral=%.1fW (%s) but Error=%.1fW (%s) - RESETTING integral!",
-                            self.error_integral, "charge" if integral_sign > 0 else "discharge",
-                            error, "charge" if error_sign > 0 else "discharge")
+                            self.error_integral, "charge" if self.error_integral > 0 else "discharge",
+                            error, "charge" if error > 0 else "discharge")
                 self.error_integral = 0.0
                 self.sign_changes = 0  # Reset oscillation counter too
             
-            # LEAKY INTEGRATOR: Apply decay before adding new error
+            # LEAKY INTEGRATOR: Apply decay before the integral is used
             # This prevents the integral from growing unbounded and helps it "forget" old errors
+            # (the new error is accumulated after the output limits are known, see below)
             self.error_integral *= self.integral_decay
-            
-            # Calculate potential new integral value
-            new_integral = self.error_integral + error * self.dt
-            
-            # CONDITIONAL INTEGRATION (Anti-windup):
-            # Only accumulate integral if we're NOT saturated at the limits
-            # This prevents integral windup when output is already at maximum
-            is_saturated_positive = new_integral > self.max_charge_capacity
-            is_saturated_negative = new_integral < -self.max_discharge_capacity
-            
-            if is_saturated_positive:
-                self.error_integral = self.max_charge_capacity
-                _LOGGER.warning("PID anti-windup: Integral SATURATED at max charge capacity +%dW (not accumulating)", 
-                              self.max_charge_capacity)
-            elif is_saturated_negative:
-                self.error_integral = -self.max_discharge_capacity
-                _LOGGER.warning("PID anti-windup: Integral SATURATED at max discharge capacity -%dW (not accumulating)", 
-                              self.max_discharge_capacity)
-            else:
-                # Not saturated, safe to accumulate
-                self.error_integral = new_integral
-                _LOGGER.debug("PID: Integral updated to %.1fW (within limits)", self.error_integral)
         else:
             # Integral disabled - ensure it stays at zero
             self.error_integral = 0.0
         
+        # Controller state read several times below; bound once per cycle
+        previous_power = self.previous_power
+
         # Calculate derivative (rate of change of error)
-        error_derivative = (error - self.previous_error) / self.dt
+        error_derivative = (error - self.previous_error) / self._cycle_dt
         
         # PID terms
         P = self.kp * error
@@ -1941,25 +2291,25 @@ class ChargeDischargeController:
         pd_adjustment = P + I + D
         
         # Apply adjustment to previous power to get new target
-        new_power_raw = self.previous_power - pd_adjustment  # Minus because we're correcting the imbalance
+        new_power_raw = previous_power - pd_adjustment  # Minus because we're correcting the imbalance
         
         # RATE LIMITER: Prevent abrupt changes that cause overshoot
-        power_change = new_power_raw - self.previous_power
+        power_change = new_power_raw - previous_power
         if abs(power_change) > self.max_power_change_per_cycle:
             # Clamp the change to maximum allowed rate
-            sign = 1 if power_change > 0 else -1
-            new_power = self.previous_power + (sign * self.max_power_change_per_cycle)
+            new_power = previous_power + math.copysign(self.max_power_change_per_cycle, power_change)
             _LOGGER.info("PD: Rate limiter active - requested change %.1fW exceeds limit ±%dW, clamping to %.1fW",
-                        power_change, self.max_power_change_per_cycle, new_power - self.previous_power)
+                        power_change, self.max_power_change_per_cycle, new_power - previous_power)
         else:
             new_power = new_power_raw
         
-        _LOGGER.debug("PD: Adjustment=%.1fW, Previous power=%.1fW, New target=%.1fW",
-                     pd_adjustment, self.previous_power, new_power)
+        if self._dbg:
+            _LOGGER.debug("PD: Adjustment=%.1fW, Previous power=%.1fW, New target=%.1fW",
+                         pd_adjustment, previous_power, new_power)
         
         # DIRECTIONAL HYSTERESIS: Prevent rapid switching between charge/discharge
         # If we're changing direction, the new power must overcome the hysteresis threshold
-        current_output_sign = 1 if new_power > 0 else (-1 if new_power < 0 else 0)
+        current_output_sign = (new_power > 0) - (new_power < 0)
         
         if self.last_output_sign != 0 and current_output_sign != 0:
             if self.last_output_sign != current_output_sign:
@@ -1977,27 +2327,28 @@ class ChargeDischargeController:
         # This is done conditionally based on whether the operation is restricted by time slots
         
         # Log control output
-        if self.ki > 0:
-            # Calculate integral utilization percentage for monitoring
-            if self.error_integral > 0:  # Integral is positive (charging direction)
-                integral_percent = (self.error_integral / self.max_charge_capacity) * 100 if self.max_charge_capacity > 0 else 0
-            elif self.error_integral < 0:  # Integral is negative (discharging direction)
-                integral_percent = (abs(self.error_integral) / self.max_discharge_capacity) * 100 if self.max_discharge_capacity > 0 else 0
-            else:
-                integral_percent = 0
+        if self._dbg:
+            if self.ki > 0:
+                # Calculate integral utilization percentage for monitoring
+                if self.error_integral > 0:  # Integral is positive (charging direction)
+                    integral_percent = (self.error_integral / self.max_charge_capacity) * 100 if self.max_charge_capacity > 0 else 0
+                elif self.error_integral < 0:  # Integral is negative (discharging direction)
+                    integral_percent = (abs(self.error_integral) / self.max_discharge_capacity) * 100 if self.max_discharge_capacity > 0 else 0
+                else:
+                    integral_percent = 0
             
-            _LOGGER.debug("ChargeDischargeController: PD Control - Grid=%.1fW, P=%.1fW, I=%.1fW (%.0f%%), D=%.1fW, Adjustment=%.1fW, New=%.1fW",
-                          error, P, I, integral_percent, D, pd_adjustment, new_power)
-        else:
-            # Integral disabled - simpler log
-            _LOGGER.debug("ChargeDischargeController: PD Control - Grid=%.1fW, P=%.1fW, D=%.1fW, Adjustment=%.1fW, New=%.1fW",
-                          error, P, D, pd_adjustment, new_power)
+                _LOGGER.debug("ChargeDischargeController: PD Control - Grid=%.1fW, P=%.1fW, I=%.1fW (%.0f%%), D=%.1fW, Adjustment=%.1fW, New=%.1fW",
+                              error, P, I, integral_percent, D, pd_adjustment, new_power)
+            else:
+                # Integral disabled - simpler log
+                _LOGGER.debug("ChargeDischargeController: PD Control - Grid=%.1fW, P=%.1fW, D=%.1fW, Adjustment=%.1fW, New=%.1fW",
+                              error, P, D, pd_adjustment, new_power)
         
         # Determine if charging or discharging (before applying restrictions)
         is_charging = new_power > 0
         
         # Check if the operation is allowed based on time slots
-        operation_restricted = not self._is_operation_allowed(is_charging)
+        operation_restricted = not self._is_operation_allowed(is_charging, now)
         if operation_restricted:
             if is_charging:
                 _LOGGER.info("ChargeDischargeController: Charging NOT ALLOWED by time slot configuration - controller paused")
@@ -2007,17 +2358,21 @@ class ChargeDischargeController:
             is_charging = False  # Reset since we're forcing to 0
         
         # Get available batteries (after checking restrictions to determine correct operation mode)
-        available_batteries = self._get_available_batteries(is_charging)
+        available_batteries = self._get_available_batteries(is_charging, weekly_charge_active)
         
         # Apply limits: calculate max total power based on AVAILABLE batteries (not all coordinators)
         # This ensures we only compare against batteries that can actually participate
-        if available_batteries:
-            max_total_discharge = sum(c.max_discharge_power for c in available_batteries)
-            max_total_charge = sum(c.max_charge_power for c in available_batteries)
+        # (no batteries available means zero limits)
+        if len(available_batteries) == len(self.coordinators):
+            # Every battery participates: reuse the totals kept by refresh_capacity_limits()
+            max_total_discharge = self.max_discharge_capacity
+            max_total_charge = self.max_charge_capacity
         else:
-            # No batteries available, use zero limits
             max_total_discharge = 0
             max_total_charge = 0
+            for c in available_batteries:
+                max_total_discharge += c.max_discharge_power
+                max_total_charge += c.max_charge_power
         
         # Clamp new_power to realistic limits (only if not already restricted to 0)
         if not operation_restricted and new_power != 0:
@@ -2025,14 +2380,34 @@ class ChargeDischargeController:
                 new_power = max_total_discharge
             elif new_power < -max_total_charge:
                 new_power = -max_total_charge
+
+        # BACK-CALCULATION (Anti-windup):
+        # Feed back the part of the request that the rate limiter, hysteresis and battery
+        # limits cut away, so the integral unwinds while the output is saturated instead of
+        # sitting at a rail. Frozen while a time slot forces the controller to 0
+        if self.ki > 0 and not operation_restricted:
+            # Output = previous - ki * integral, so a clipped output of (raw - new) is
+            # unwound by adding gain * (raw - new) / ki to the integral
+            self.error_integral += (
+                error * self._cycle_dt
+                + self.back_calculation_gain * (new_power_raw - new_power) / self.ki
+            )
+            # Battery capacities remain a hard safety rail on the integral
+            self.error_integral = min(
+                max(self.error_integral, -self.max_discharge_capacity),
+                self.max_charge_capacity,
+            )
+            if self._dbg:
+                _LOGGER.debug("PID: Integral updated to %.1fW", self.error_integral)
         
-        _LOGGER.debug("ChargeDischargeController: sensor_actual=%fW, previous_power=%fW, new_power=%fW (available: %d batteries)",
-                     sensor_actual, self.previous_power, new_power, len(available_batteries))
+        if self._dbg:
+            _LOGGER.debug("ChargeDischargeController: sensor_actual=%fW, previous_power=%fW, new_power=%fW (available: %d batteries)",
+                         sensor_actual, previous_power, new_power, len(available_batteries))
         
         if not available_batteries:
-            _LOGGER.debug("ChargeDischargeController: No available batteries, setting all to 0.")
-            for coordinator in self.coordinators:
-                await self._set_battery_power(coordinator, 0, 0)
+            if self._dbg:
+                _LOGGER.debug("ChargeDischargeController: No available batteries, setting all to 0.")
+            await self._apply_power_allocation({}, is_charging)
             self.previous_power = 0
             self.previous_sensor = sensor_actual
             return
@@ -2040,23 +2415,13 @@ class ChargeDischargeController:
         # Distribute power respecting individual battery limits
         power_allocation = self._distribute_power_by_limits(abs(new_power), available_batteries, is_charging)
 
-        total_allocated = sum(power_allocation.values())
-        _LOGGER.debug("ChargeDischargeController: Setting power to %dW total across %d batteries: %s",
-                      total_allocated, len(available_batteries),
-                      {c.name: p for c, p in power_allocation.items()})
+        if self._dbg:
+            _LOGGER.debug("ChargeDischargeController: Setting power to %dW total across %d batteries: %s",
+                          sum(power_allocation.values()), len(available_batteries),
+                          {c.name: p for c, p in power_allocation.items()})
 
-        # Write to available batteries
-        for coordinator in available_batteries:
-            power = power_allocation.get(coordinator, 0)
-            if is_charging:
-                await self._set_battery_power(coordinator, power, 0)
-            else:
-                await self._set_battery_power(coordinator, 0, power)
-        
-        # Set remaining batteries to 0
-        for coordinator in self.coordinators:
-            if coordinator not in available_batteries:
-                await self._set_battery_power(coordinator, 0, 0)
+        # Write to available batteries (remaining batteries are set to 0)
+        await self._apply_power_allocation(power_allocation, is_charging)
         
         # Update state for next cycle
         self.previous_power = new_power
@@ -2065,66 +2430,45 @@ class ChargeDischargeController:
         # CRITICAL: Only update PD controller state if NOT restricted by time slots
         # This prevents false oscillation warnings when controller is paused
         if not operation_restricted:
-            # Controller is active - perform oscillation detection and update state
-            
-            # OSCILLATION DETECTION: Detect if system is oscillating (frequent sign changes)
-            # Key principle: Only track oscillations OUTSIDE deadband
-            # - Inside deadband: System is stable, fluctuations are acceptable
-            # - Outside deadband: Controller is active, sign changes indicate instability
-            error_outside_deadband = abs(error) > self.deadband
-            
-            if error_outside_deadband:
-                # Error is outside deadband - controller is actively trying to correct
-                current_error_sign = 1 if error > 0 else (-1 if error < 0 else 0)
-                
-                # Only count sign changes when BOTH current and previous errors were outside deadband
-                if current_error_sign != 0 and self.last_error_sign != 0:
-                    if current_error_sign != self.last_error_sign:
-                        # Sign changed while outside deadband - potential oscillation
-                        self.sign_changes += 1
-                        
-                        # If too many consecutive sign changes, reset PID to stabilize
-                        if self.sign_changes >= self.oscillation_threshold:
+            # OSCILLATION DETECTION: Count consecutive error sign flips OUTSIDE the deadband
+            # (inside it, fluctuations are acceptable and the counter starts over). Skipped
+            # while the output is pinned at the battery limits: the error can't be corrected
+            # any further there, so its swings say nothing about controller stability
+            output_saturated = new_power >= max_total_discharge or new_power <= -max_total_charge
+            if abs(error) <= self.deadband:
+                # Note: last_error_sign is NOT updated when inside deadband
+                self.sign_changes = 0
+            elif not output_saturated:
+                current_error_sign = (error > 0) - (error < 0)
+                if self.last_error_sign:
+                    self.sign_changes = (
+                        self.sign_changes + 1 if current_error_sign != self.last_error_sign else 0
+                    )
+                    # If too many consecutive sign changes, reset PID to stabilize
+                    if self.sign_changes >= self.oscillation_threshold:
+                        if self._dbg:
                             _LOGGER.debug("PID: Oscillation detected (grid swinging ±%.1fW). Resetting PID state.",
                                           abs(error))
-                            self.error_integral = 0.0
-                            self.previous_error = 0.0
-                            self.sign_changes = 0
-                            # Don't return, allow proportional control to continue
-                    else:
-                        # Same sign, reset counter (system is stable in one direction)
-                        if self.sign_changes > 0:
-                            _LOGGER.debug("PID: Error sign stable outside deadband, resetting oscillation counter (was %d)", 
-                                         self.sign_changes)
-                            self.sign_changes = 0
-                
-                # Update last_error_sign only when outside deadband
+                        self.error_integral = 0.0
+                        self.sign_changes = 0
                 self.last_error_sign = current_error_sign
-            else:
-                # Inside deadband - reset oscillation counter if any
-                # This prevents false positives from small fluctuations within tolerance
-                if self.sign_changes > 0:
-                    _LOGGER.debug("PID: Back inside deadband (error=%.1fW < ±%dW), resetting oscillation counter (was %d)", 
-                                 error, self.deadband, self.sign_changes)
-                    self.sign_changes = 0
-                # Note: last_error_sign is NOT updated when inside deadband
-                # This ensures we only track sign changes that matter (outside deadband)
             self.previous_error = error
             self.last_output_sign = current_output_sign
-            _LOGGER.debug("ChargeDischargeController: PD state updated - previous_error=%.1fW, error_sign=%d, output_sign=%d",
-                         self.previous_error, self.last_error_sign, self.last_output_sign)
+            if self._dbg:
+                _LOGGER.debug("ChargeDischargeController: PD state updated - previous_error=%.1fW, error_sign=%d, output_sign=%d",
+                             self.previous_error, self.last_error_sign, self.last_output_sign)
         else:
             # Controller is paused by restrictions - DO NOT update error tracking
             # This prevents false oscillation detection from natural load fluctuations
-            _LOGGER.debug("ChargeDischargeController: PD state FROZEN (restricted) - error tracking paused to prevent false oscillation warnings")
+            if self._dbg:
+                _LOGGER.debug("ChargeDischargeController: PD state FROZEN (restricted) - error tracking paused to prevent false oscillation warnings")
         
-        _LOGGER.debug("ChargeDischargeController: async_update_charge_discharge finished.")
+        if self._dbg:
+            _LOGGER.debug("ChargeDischargeController: async_update_charge_discharge finished.")
 
 
 async def _restore_consumption_history(hass: HomeAssistant, entry: ConfigEntry, controller: ChargeDischargeController) -> None:
     """Restore daily consumption history from previous session."""
-    from datetime import date
-    from homeassistant.util import dt as dt_util
     
     if not controller.predictive_charging_enabled:
         return  # Not using predictive charging, no history needed
@@ -2145,21 +2489,86 @@ async def _restore_consumption_history(hass: HomeAssistant, entry: ConfigEntry,
         return
     
     try:
-        # Convert stored data back to list of tuples with date objects
-        controller._daily_consumption_history = [
+        # Convert stored data back to date objects
+        controller._replace_consumption_history(
             (date.fromisoformat(date_str), consumption)
             for date_str, consumption in history_data
-        ]
+        )
         
         _LOGGER.info(
             "Restored consumption history: %d days (oldest: %s, newest: %s)",
             len(controller._daily_consumption_history),
-            controller._daily_consumption_history[0][0] if controller._daily_consumption_history else "N/A",
-            controller._daily_consumption_history[-1][0] if controller._daily_consumption_history else "N/A"
+            min(controller._daily_consumption_history, default="N/A"),
+            max(controller._daily_consumption_history, default="N/A")
         )
     except Exception as e:
         _LOGGER.warning("Failed to restore consumption history: %s", e)
-        controller._daily_consumption_history = []
+        controller._replace_consumption_history([])
+
+
+async def _initialize_battery(coordinator: MarstekVenusDataUpdateCoordinator, battery_config: dict) -> None:
+    """Connect to a battery, write its initial configuration and fetch the first data."""
+    connected = await coordinator.connect()
+    if not connected:
+        _LOGGER.warning("Initial connection to %s failed. The integration will keep trying.", coordinator.host)
+    else:
+        # Enable RS485 Control Mode first (required to apply configuration changes)
+        # Only done during integration setup/reload, not repeated during runtime
+        _LOGGER.info("Enabling RS485 Control Mode for %s (only on initial setup)", battery_config[CONF_NAME])
+        rs485_reg = coordinator.get_register("rs485_control")
+        if rs485_reg:
+            await coordinator.write_register(rs485_reg, 21930, do_refresh=False)  # 0x55AA
+            await asyncio.sleep(0.1)
+
+        # Write initial configuration values to the battery
+        max_soc_value = int(battery_config["max_soc"] / 0.1)  # Convert to register value
+        min_soc_value = int(battery_config["min_soc"] / 0.1)  # Convert to register value
+        max_charge_power = int(battery_config["max_charge_power"])
+        max_discharge_power = int(battery_config["max_discharge_power"])
+
+        _LOGGER.info("Writing initial configuration for %s (%s): max_soc=%d%%, min_soc=%d%%, max_charge=%dW, max_discharge=%dW",
+                   battery_config[CONF_NAME], coordinator.battery_version,
+                   battery_config["max_soc"], battery_config["min_soc"],
+                   max_charge_power, max_discharge_power)
+
+        # Write cutoff capacities (v2 only - hardware registers)
+        cutoff_charge_reg = coordinator.get_register("charging_cutoff_capacity")
+        cutoff_discharge_reg = coordinator.get_register("discharging_cutoff_capacity")
+
+        if cutoff_charge_reg is not None:
+            await coordinator.write_register(cutoff_charge_reg, max_soc_value, do_refresh=False)
+            await asyncio.sleep(0.1)
+            _LOGGER.info("%s: Hardware charging cutoff set to %d%% (reg=%d)",
+                        coordinator.name, battery_config["max_soc"], max_soc_value)
+        else:
+            _LOGGER.info("%s: No hardware charging cutoff register (v3) - using software enforcement",
+                        coordinator.name)
+
+        if cutoff_discharge_reg is not None:
+            await coordinator.write_register(cutoff_discharge_reg, min_soc_value, do_refresh=False)
+            await asyncio.sleep(0.1)
+            _LOGGER.info("%s: Hardware discharging cutoff set to %d%% (reg=%d)",
+                        coordinator.name, battery_config["min_soc"], min_soc_value)
+        else:
+            _LOGGER.info("%s: No hardware discharging cutoff register (v3) - using software enforcement",
+                        coordinator.name)
+
+        # Write maximum power limits (available in both versions)
+        max_charge_reg = coordinator.get_register("max_charge_power")
+        max_discharge_reg = coordinator.get_register("max_discharge_power")
+
+        if max_charge_reg and max_discharge_reg:
+            await coordinator.write_register(max_charge_reg, max_charge_power, do_refresh=False)
+            await asyncio.sleep(0.1)
+            await coordinator.write_register(max_discharge_reg, max_discharge_power, do_refresh=False)
+            await asyncio.sleep(0.1)
+            _LOGGER.info("%s: Max power limits set - charge: %dW, discharge: %dW",
+                        coordinator.name, max_charge_power, max_discharge_power)
+
+        # Manually trigger first refresh and wait for it
+        await coordinator.async_request_refresh()
+        # Give a moment for the data to be processed
+        await asyncio.sleep(0.5)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -2192,75 +2601,22 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             charge_hysteresis_percent=battery_config.get("charge_hysteresis_percent", 5),
         )
         
-        # Connect and fetch initial data
-        try:
-            connected = await coordinator.connect()
-            if not connected:
-                _LOGGER.warning("Initial connection to %s failed. The integration will keep trying.", coordinator.host)
-            else:
-                # Enable RS485 Control Mode first (required to apply configuration changes)
-                # Only done during integration setup/reload, not repeated during runtime
-                _LOGGER.info("Enabling RS485 Control Mode for %s (only on initial setup)", battery_config[CONF_NAME])
-                rs485_reg = coordinator.get_register("rs485_control")
-                if rs485_reg:
-                    await coordinator.write_register(rs485_reg, 21930, do_refresh=False)  # 0x55AA
-                    await asyncio.sleep(0.1)
-
-                # Write initial configuration values to the battery
-                max_soc_value = int(battery_config["max_soc"] / 0.1)  # Convert to register value
-                min_soc_value = int(battery_config["min_soc"] / 0.1)  # Convert to register value
-                max_charge_power = int(battery_config["max_charge_power"])
-                max_discharge_power = int(battery_config["max_discharge_power"])
-
-                _LOGGER.info("Writing initial configuration for %s (%s): max_soc=%d%%, min_soc=%d%%, max_charge=%dW, max_discharge=%dW",
-                           battery_config[CONF_NAME], coordinator.battery_version,
-                           battery_config["max_soc"], battery_config["min_soc"],
-                           max_charge_power, max_discharge_power)
-
-                # Write cutoff capacities (v2 only - hardware registers)
-                cutoff_charge_reg = coordinator.get_register("charging_cutoff_capacity")
-                cutoff_discharge_reg = coordinator.get_register("discharging_cutoff_capacity")
-
-                if cutoff_charge_reg is not None:
-                    await coordinator.write_register(cutoff_charge_reg, max_soc_value, do_refresh=False)
-                    await asyncio.sleep(0.1)
-                    _LOGGER.info("%s: Hardware charging cutoff set to %d%% (reg=%d)",
-                                coordinator.name, battery_config["max_soc"], max_soc_value)
-                else:
-                    _LOGGER.info("%s: No hardware charging cutoff register (v3) - using software enforcement",
-                                coordinator.name)
-
-                if cutoff_discharge_reg is not None:
-                    await coordinator.write_register(cutoff_discharge_reg, min_soc_value, do_refresh=False)
-                    await asyncio.sleep(0.1)
-                    _LOGGER.info("%s: Hardware discharging cutoff set to %d%% (reg=%d)",
-                                coordinator.name, battery_config["min_soc"], min_soc_value)
-                else:
-                    _LOGGER.info("%s: No hardware discharging cutoff register (v3) - using software enforcement",
-                                coordinator.name)
-
-                # Write maximum power limits (available in both versions)
-                max_charge_reg = coordinator.get_register("max_charge_power")
-                max_discharge_reg = coordinator.get_register("max_discharge_power")
+        coordinators.append(coordinator)
 
-                if max_charge_reg and max_discharge_reg:
-                    await coordinator.write_register(max_charge_reg, max_charge_power, do_refresh=False)
-                    await asyncio.sleep(0.1)
-                    await coordinator.write_register(max_discharge_reg, max_discharge_power, do_refresh=False)
-                    await asyncio.sleep(0.1)
-                    _LOGGER.info("%s: Max power limits set - charge: %dW, discharge: %dW",
-                                coordinator.name, max_charge_power, max_discharge_power)
-                
-                # Manually trigger first refresh and wait for it
-                await coordinator.async_request_refresh()
-                # Give a moment for the data to be processed
-                await asyncio.sleep(0.5)
-        except Exception as e:
+    # Connect and fetch initial data for all batteries at once; the writes to any
+    # one battery stay paced inside _initialize_battery
+    results = await asyncio.gather(
+        *[
+            _initialize_battery(coordinator, battery_config)
+            for coordinator, battery_config in zip(coordinators, entry.data["batteries"])
+        ],
+        return_exceptions=True,
+    )
+    for coordinator, result in zip(coordinators, results):
+        if isinstance(result, Exception):
             # Disconnect on any setup error
-            await coordinator.disconnect()
-            raise ConfigEntryNotReady(f"Failed to set up {coordinator.host}: {e}") from e
-
-        coordinators.append(coordinator)
+            await asyncio.gather(*[c.disconnect() for c in coordinators])
+            raise ConfigEntryNotReady(f"Failed to set up {coordinator.host}: {result}") from result
 
     # Set up the charge/discharge controller BEFORE storing in hass.data
     # This allows the controller to register itself in hass.data[DOMAIN]["pid_controller"]
@@ -2286,23 +2642,45 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         "coordinators": coordinators,
         "controller": controller,
     }
+    controller.set_consumption_state(hass.states.get(controller.consumption_sensor))
     entry.async_on_unload(
-        async_track_time_interval(
-            hass, controller.async_update_charge_discharge, timedelta(seconds=2.0)
+        async_track_state_change_event(
+            hass, [controller.consumption_sensor], controller.async_consumption_state_changed
         )
     )
 
-    # Force coordinator updates every 1.5 seconds with timestamp-based per-sensor polling
-    # This ensures all sensors update according to their scan_interval
-    async def _force_coordinator_refresh(now):
-        """Force coordinator to check and update data based on timestamp thresholds."""
-        await asyncio.gather(*[coordinator.async_request_refresh() for coordinator in coordinators])
+    # One tick drives both polling and control: refresh the coordinators directly (bypassing
+    # the request debouncer; per-sensor polling is timestamp-based, so every sensor still
+    # follows its scan_interval), then run the controller on the data read so far
+    control_lock = asyncio.Lock()
+    refresh_tasks: dict[MarstekVenusDataUpdateCoordinator, asyncio.Task] = {}
+
+    async def _control_tick(now):
+        """Refresh the coordinators for up to one interval, then update charge/discharge power."""
+        # The interval timer does not wait for the previous run; a cycle slowed down by
+        # ACK retries must not interleave with the next one on the controller state
+        if control_lock.locked():
+            _LOGGER.debug("Previous control cycle still running, skipping tick")
+            return
+        async with control_lock:
+            # A refresh still hanging on an unreachable battery keeps running and is not
+            # restarted; it must not hold up control of the other batteries
+            for coordinator in coordinators:
+                task = refresh_tasks.get(coordinator)
+                if task is None or task.done():
+                    refresh_tasks[coordinator] = entry.async_create_background_task(
+                        hass, coordinator.async_refresh(), f"{DOMAIN} refresh {coordinator.name}"
+                    )
+            pending = [task for task in refresh_tasks.values() if not task.done()]
+            if pending:
+                await asyncio.wait(pending, timeout=CONTROL_INTERVAL)
+            await controller.async_update_charge_discharge(now)
     
-    _LOGGER.debug("Setting up periodic refresh for all coordinators")
+    _LOGGER.debug("Setting up periodic refresh and control for all coordinators")
     
     entry.async_on_unload(
         async_track_time_interval(
-            hass, _force_coordinator_refresh, timedelta(seconds=1.5)
+            hass, _control_tick, timedelta(seconds=CONTROL_INTERVAL)
         )
     )
 
@@ -2349,13 +2727,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if data := hass.data[DOMAIN].get(entry.entry_id):
         coordinators = data.get("coordinators", [])
 
+        # Flush any delayed consumption history write so a reload reads fresh data
+        if controller := data.get("controller"):
+            await controller._save_consumption_history()
+
         # Set shutdown flag on all coordinators to suppress expected errors
         for coordinator in coordinators:
             coordinator.set_shutting_down(True)
 
         # Safely shut down all batteries before unloading
         _LOGGER.info("Shutting down integration - stopping all battery operations")
-        for coordinator in coordinators:
+
+        async def _shutdown_battery(coordinator):
             try:
                 # Get version-specific registers
                 discharge_reg = coordinator.get_register("set_discharge_power")
@@ -2384,6 +2767,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 _LOGGER.info("%s: Shutdown complete - all control registers reset", coordinator.name)
             except Exception as e:
                 _LOGGER.error("Error shutting down battery %s: %s", coordinator.name, e)
+
+        await asyncio.gather(*[_shutdown_battery(c) for c in coordinators])
         
         # Disconnect from all coordinators
         await asyncio.gather(*[c.disconnect() for c in coordinators])
@@ -189,11 +189,12 @@ class PredictiveChargingStatusSensor(BinarySensorEntity):
         attrs["max_contracted_power"] = self.controller.max_contracted_power
 
         # Persist daily consumption history for restoration after restarts
-        if hasattr(self.controller, '_daily_consumption_history') and self.controller._daily_consumption_history:
+        history = self.controller._consumption_history_items()
+        if history:
             attrs["daily_consumption_history"] = [
-                (d.isoformat(), c) for d, c in self.controller._daily_consumption_history
+                (d.isoformat(), c) for d, c in history
             ]
-            attrs["history_days"] = len(self.controller._daily_consumption_history)
+            attrs["history_days"] = len(history)
 
         # Add last decision data if available (for diagnostics)
         if hasattr(self.controller, '_last_decision_data') and self.controller._last_decision_data:
@@ -17,14 +17,13 @@ async def async_setup_entry(
 ) -> None:
     """Set up the button platform."""
     coordinators: list[MarstekVenusDataUpdateCoordinator] = hass.data[DOMAIN][entry.entry_id]["coordinators"]
-    entities = []
 
     # Add regular battery buttons
-    for coordinator in coordinators:
-        for definition in BUTTON_DEFINITIONS:
-            entities.append(MarstekVenusButton(coordinator, definition))
-
-    async_add_entities(entities)
+    async_add_entities(
+        MarstekVenusButton(coordinator, definition)
+        for coordinator in coordinators
+        for definition in BUTTON_DEFINITIONS
+    )
 
 
 class MarstekVenusButton(ButtonEntity):
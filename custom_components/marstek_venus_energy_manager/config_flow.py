@@ -1,12 +1,13 @@
 """Config flow for Marstek Venus Energy Manager integration."""
 from __future__ import annotations
 
+import functools
 import logging
 from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigFlow, OptionsFlow, ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
 from homeassistant.data_entry_flow import FlowResult
@@ -48,6 +49,296 @@ from .modbus_client import MarstekModbusClient
 
 _LOGGER = logging.getLogger(__name__)
 
+# Register read by _test_connection to probe each battery version
+_SOC_REGISTERS = {version: registers.get("battery_soc") for version, registers in REGISTER_MAP.items()}
+
+# Immutable on purpose; selectors and defaults get their own list(_WEEKDAYS) copy,
+# since HA's multiple select only accepts lists
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Selectors are stateless, so each one is built once and shared by every form
+_SENSOR_SELECTOR = EntitySelector(EntitySelectorConfig(domain="sensor"))
+_NUM_BATTERIES_SELECTOR = NumberSelector(
+    NumberSelectorConfig(min=1, max=4, mode=NumberSelectorMode.SLIDER)
+)
+_VERSION_SELECTOR = SelectSelector(
+    SelectSelectorConfig(
+        options=[
+            {"value": "v2", "label": "v1/v2"},
+            {"value": "v3", "label": "v3"},
+        ],
+        mode=SelectSelectorMode.DROPDOWN,
+    )
+)
+_POWER_LIMIT_SELECTOR = SelectSelector(
+    SelectSelectorConfig(
+        options=[
+            {"value": "800", "label": "800W"},
+            {"value": "2500", "label": "2500W"},
+        ],
+        mode=SelectSelectorMode.DROPDOWN,
+    )
+)
+_MAX_SOC_SELECTOR = NumberSelector(NumberSelectorConfig(min=80, max=100, step=1, mode=NumberSelectorMode.SLIDER))
+_MIN_SOC_SELECTOR = NumberSelector(NumberSelectorConfig(min=12, max=30, step=1, mode=NumberSelectorMode.SLIDER))
+_HYSTERESIS_PERCENT_SELECTOR = NumberSelector(
+    NumberSelectorConfig(min=5, max=20, step=1, mode=NumberSelectorMode.SLIDER)
+)
+_TIME_SELECTOR = TimeSelector()
+_DAYS_SELECTOR = SelectSelector(
+    SelectSelectorConfig(
+        options=list(_WEEKDAYS),
+        translation_key="weekday",
+        multiple=True,
+        mode=SelectSelectorMode.DROPDOWN,
+    )
+)
+_DAY_SELECTOR = SelectSelector(
+    SelectSelectorConfig(
+        options=list(_WEEKDAYS),
+        translation_key="weekday",
+        mode=SelectSelectorMode.DROPDOWN,
+    )
+)
+_CONTRACTED_POWER_SELECTOR = NumberSelector(
+    NumberSelectorConfig(min=1000, max=15000, step=100, mode=NumberSelectorMode.BOX)
+)
+_PD_KP_SELECTOR = NumberSelector(NumberSelectorConfig(min=0.1, max=2.0, step=0.05, mode=NumberSelectorMode.BOX))
+_PD_KD_SELECTOR = NumberSelector(NumberSelectorConfig(min=0.0, max=2.0, step=0.05, mode=NumberSelectorMode.BOX))
+_PD_DEADBAND_SELECTOR = NumberSelector(NumberSelectorConfig(min=0, max=200, step=5, mode=NumberSelectorMode.SLIDER))
+_PD_MAX_POWER_CHANGE_SELECTOR = NumberSelector(
+    NumberSelectorConfig(min=100, max=2000, step=50, mode=NumberSelectorMode.SLIDER)
+)
+_PD_DIRECTION_HYSTERESIS_SELECTOR = NumberSelector(
+    NumberSelectorConfig(min=0, max=200, step=5, mode=NumberSelectorMode.SLIDER)
+)
+
+# Defaults for a battery that is not in the entry yet
+_NEW_BATTERY_DEFAULTS = {
+    CONF_PORT: 502,
+    CONF_BATTERY_VERSION: DEFAULT_VERSION,
+    "max_charge_power": 2500,
+    "max_discharge_power": 2500,
+    "max_soc": 100,
+    "min_soc": 12,
+    "enable_charge_hysteresis": False,
+    "charge_hysteresis_percent": 5,
+}
+
+
+# Form builders shared by the config and options flows; the options flow passes
+# the entry's current values as defaults, fields left out render empty
+def _toggle_schema(key: str, default: bool) -> vol.Schema:
+    return vol.Schema({vol.Required(key, default=default): bool})
+
+
+def _consumption_sensor_schema(default: Any = vol.UNDEFINED) -> vol.Schema:
+    return vol.Schema({vol.Required("consumption_sensor", default=default): _SENSOR_SELECTOR})
+
+
+def _num_batteries_schema(default: int) -> vol.Schema:
+    return vol.Schema({vol.Required("num_batteries", default=default): _NUM_BATTERIES_SELECTOR})
+
+
+def _battery_config_schema(defaults: dict[str, Any]) -> vol.Schema:
+    return vol.Schema(
+        {
+            vol.Required(CONF_NAME, default=defaults[CONF_NAME]): str,
+            vol.Required(CONF_HOST, default=defaults.get(CONF_HOST, vol.UNDEFINED)): str,
+            vol.Required(CONF_PORT, default=defaults[CONF_PORT]): int,
+            vol.Required(CONF_BATTERY_VERSION, default=defaults[CONF_BATTERY_VERSION]): _VERSION_SELECTOR,
+            vol.Required("max_charge_power", default=str(defaults["max_charge_power"])): _POWER_LIMIT_SELECTOR,
+            vol.Required("max_discharge_power", default=str(defaults["max_discharge_power"])):
+                _POWER_LIMIT_SELECTOR,
+            vol.Required("max_soc", default=defaults["max_soc"]): _MAX_SOC_SELECTOR,
+            vol.Required("min_soc", default=defaults["min_soc"]): _MIN_SOC_SELECTOR,
+            vol.Required("enable_charge_hysteresis", default=defaults["enable_charge_hysteresis"]): bool,
+            vol.Optional("charge_hysteresis_percent", default=defaults["charge_hysteresis_percent"]):
+                _HYSTERESIS_PERCENT_SELECTOR,
+        }
+    )
+
+
+def _with_add_more(fields: dict, add_more: bool | None) -> vol.Schema:
+    # Repeated items ask "add another?" on their own form; the last allowed item omits it
+    if add_more is not None:
+        fields[vol.Required("add_more", default=add_more)] = bool
+    return vol.Schema(fields)
+
+
+def _time_slot_schema(defaults: dict[str, Any], add_more: bool | None = None) -> vol.Schema:
+    return _with_add_more(
+        {
+            vol.Required("start_time", default=defaults.get("start_time", vol.UNDEFINED)): _TIME_SELECTOR,
+            vol.Required("end_time", default=defaults.get("end_time", vol.UNDEFINED)): _TIME_SELECTOR,
+            vol.Required("days", default=list(defaults.get("days", _WEEKDAYS))): _DAYS_SELECTOR,
+            vol.Required("apply_to_charge", default=defaults.get("apply_to_charge", False)): bool,
+        },
+        add_more,
+    )
+
+
+def _excluded_device_schema(defaults: dict[str, Any], add_more: bool | None = None) -> vol.Schema:
+    return _with_add_more(
+        {
+            vol.Required("power_sensor", default=defaults.get("power_sensor", vol.UNDEFINED)): _SENSOR_SELECTOR,
+            vol.Required("included_in_consumption", default=defaults.get("included_in_consumption", True)): bool,
+        },
+        add_more,
+    )
+
+
+# Optional features are enabled and configured on one page; the details are
+# only read when the toggle is on
+def _predictive_charging_schema(defaults: dict[str, Any]) -> vol.Schema:
+    return vol.Schema(
+        {
+            vol.Required("configure_predictive_charging", default=defaults.get("enabled", False)): bool,
+            vol.Required("start_time", default=defaults.get("start_time", "01:00:00")): _TIME_SELECTOR,
+            vol.Required("end_time", default=defaults.get("end_time", "06:00:00")): _TIME_SELECTOR,
+            vol.Required("days", default=list(defaults.get("days", _WEEKDAYS))): _DAYS_SELECTOR,
+            vol.Optional("solar_forecast_sensor", default=defaults.get("solar_forecast_sensor") or vol.UNDEFINED):
+                _SENSOR_SELECTOR,
+            vol.Required("max_contracted_power", default=defaults.get("max_contracted_power", 7000)):
+                _CONTRACTED_POWER_SELECTOR,
+        }
+    )
+
+
+def _weekly_full_charge_schema(enabled: bool, day: str) -> vol.Schema:
+    return vol.Schema(
+        {
+            vol.Required("configure_weekly_full_charge", default=enabled): bool,
+            vol.Required("weekly_full_charge_day", default=day): _DAY_SELECTOR,
+        }
+    )
+
+
+def _forecast_sensor_error(hass: HomeAssistant, entity_id: str | None) -> str | None:
+    """Check the solar forecast sensor exists and reports energy."""
+    forecast_state = hass.states.get(entity_id) if entity_id else None
+    if forecast_state is None:
+        return "sensor_not_found"
+    if forecast_state.attributes.get("unit_of_measurement", "") not in ("kWh", "Wh"):
+        return "invalid_unit"
+    return None
+
+
+# Config flow forms whose defaults never change are compiled once
+_USER_SCHEMA = _consumption_sensor_schema()
+_BATTERIES_SCHEMA = _num_batteries_schema(1)
+_TIME_SLOTS_SCHEMA = _toggle_schema("configure_time_slots", False)
+_ADD_TIME_SLOT_SCHEMA = _time_slot_schema({}, add_more=False)
+_LAST_TIME_SLOT_SCHEMA = _time_slot_schema({})
+_EXCLUDED_DEVICES_SCHEMA = _toggle_schema("configure_excluded_devices", False)
+_ADD_EXCLUDED_DEVICE_SCHEMA = _excluded_device_schema({}, add_more=False)
+_LAST_EXCLUDED_DEVICE_SCHEMA = _excluded_device_schema({})
+_PREDICTIVE_CHARGING_SCHEMA = _predictive_charging_schema({})
+_WEEKLY_FULL_CHARGE_SCHEMA = _weekly_full_charge_schema(False, "sun")
+
+
+def _running_coordinator(hass: HomeAssistant, host: str, port: int):
+    """Return the coordinator of a loaded entry that is already connected to host:port."""
+    for entry_data in hass.data.get(DOMAIN, {}).values():
+        for coordinator in entry_data.get("coordinators", ()):
+            if coordinator.host == host and coordinator.port == port:
+                return coordinator
+    return None
+
+
+def _soc_probe_error(value: int | None, host: str, port: int, version: str, soc_register: int) -> str | None:
+    """Map a probed SOC reading to a form error key, or None when it is plausible."""
+    if value is None:
+        _LOGGER.error("Failed to read SOC register %d from %s:%s (%s)", soc_register, host, port, version)
+        return "cannot_connect"
+    if not 0 <= value <= 100:
+        # The battery answered, but this register is not a SOC on its firmware
+        _LOGGER.error(
+            "Register %d on %s:%s reads %s, not a SOC; wrong battery version (%s)?",
+            soc_register, host, port, value, version,
+        )
+        return "version_mismatch"
+    _LOGGER.info("Successfully read from %s:%s (%s), SOC: %s", host, port, version, value)
+    return None
+
+
+async def _probe_battery(
+    hass: HomeAssistant,
+    clients: dict[tuple[str, int], MarstekModbusClient],
+    host: str,
+    port: int,
+    version: str,
+) -> str | None:
+    """Read the version-specific SOC register to check a battery is reachable.
+
+    Returns None on success, otherwise the error key for the form. Batteries
+    accept a single Modbus TCP connection, so a battery that a loaded entry is
+    already polling is probed through that entry's client, falling back to a
+    new connection when that client is not connected or does not answer. A new
+    connection is kept in clients for the rest of the flow so re-probing the
+    same battery, e.g. after picking another version, skips the handshake.
+    """
+    _LOGGER.info("Testing connection to %s:%s (%s)", host, port, version)
+    soc_register = _SOC_REGISTERS.get(version)
+    if soc_register is None:
+        _LOGGER.error("Unknown version: %s", version)
+        return "cannot_connect"
+
+    coordinator = _running_coordinator(hass, host, port)
+    if coordinator is not None:
+        value = None
+        if getattr(coordinator.client.client, "connected", False):
+            try:
+                async with coordinator.lock:
+                    value = await coordinator.client.async_read_register(soc_register, "uint16")
+            except Exception as e:
+                _LOGGER.error("Connection test exception %s:%s (%s): %s", host, port, version, e)
+        if value is not None:
+            return _soc_probe_error(value, host, port, version, soc_register)
+        # The entry's connection is down or stale, so the battery may accept a new one
+        _LOGGER.warning(
+            "Connection of the running entry to %s:%s did not answer, probing with a new connection",
+            host, port,
+        )
+
+    key = (host, port)
+    client = clients.get(key)
+    connected = client is not None
+    try:
+        if not connected:
+            client = MarstekModbusClient(host, port)
+            connected = await client.async_connect()
+            if not connected:
+                _LOGGER.error("Failed to connect to %s:%s", host, port)
+                return "cannot_connect"
+            clients[key] = client
+
+        _LOGGER.info("Connected to %s:%s (%s), attempting to read register %d", host, port, version, soc_register)
+        value = await client.async_read_register(soc_register, "uint16")
+    except Exception as e:
+        _LOGGER.error("Connection test exception %s:%s (%s): %s", host, port, version, e)
+        value = None
+
+    error = _soc_probe_error(value, host, port, version, soc_register)
+    if error == "cannot_connect":
+        # Drop a connection that failed so the next attempt starts clean; a client
+        # that never connected has nothing to tear down
+        clients.pop(key, None)
+        if connected:
+            await client.async_close()
+    return error
+
+
+async def _close_probe_clients(clients: dict[tuple[str, int], MarstekModbusClient]) -> None:
+    """Close the connections kept open by _test_connection.
+
+    Batteries accept a single Modbus TCP connection, so these must be released
+    before the entry (re)loads and its coordinators connect.
+    """
+    for client in clients.values():
+        await client.async_close()
+    clients.clear()
+
 
 class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Marstek Venus Energy Manager."""
@@ -61,41 +352,17 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
         self.battery_index = 0
         self.time_slots = []
         self.excluded_devices = []
+        self._probe_clients: dict[tuple[str, int], MarstekModbusClient] = {}
 
-    async def _test_connection(self, host: str, port: int, version: str = "v2") -> bool:
-        """Test connection to a Marstek Venus battery using version-specific register."""
-        _LOGGER.info("Testing connection to %s:%s (%s)", host, port, version)
-        client = MarstekModbusClient(host, port)
-        try:
-            connected = await client.async_connect()
-            if not connected:
-                _LOGGER.error("Failed to connect to %s:%s", host, port)
-                return False
-
-            # Test with version-specific SOC register
-            soc_register = REGISTER_MAP.get(version, {}).get("battery_soc")
-            if soc_register is None:
-                _LOGGER.error("Unknown version: %s", version)
-                await client.async_close()
-                return False
-
-            _LOGGER.info("Connected to %s:%s (%s), attempting to read register %d", host, port, version, soc_register)
-            value = await client.async_read_register(soc_register, "uint16")
-            await client.async_close()
+    @callback
+    def async_remove(self) -> None:
+        """Release probe connections when the flow is abandoned."""
+        if self._probe_clients:
+            self.hass.async_create_task(_close_probe_clients(self._probe_clients))
 
-            if value is not None:
-                _LOGGER.info("Successfully read from %s:%s (%s), SOC: %s", host, port, version, value)
-                return True
-            else:
-                _LOGGER.error("Failed to read SOC register %d from %s:%s (%s)", soc_register, host, port, version)
-                return False
-        except Exception as e:
-            _LOGGER.error("Connection test exception %s:%s (%s): %s", host, port, version, e)
-            try:
-                await client.async_close()
-            except Exception:
-                pass
-            return False
+    async def _test_connection(self, host: str, port: int, version: str = "v2") -> str | None:
+        """Test connection to a Marstek Venus battery; returns a form error key on failure."""
+        return await _probe_battery(self.hass, self._probe_clients, host, port, version)
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -107,12 +374,7 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="user",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("consumption_sensor"):
-                        EntitySelector(EntitySelectorConfig(domain="sensor")),
-                }
-            ),
+            data_schema=_USER_SCHEMA,
         )
 
     async def async_step_batteries(
@@ -125,16 +387,7 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="batteries",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("num_batteries", default=1):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=1, max=4, mode=NumberSelectorMode.SLIDER
-                            )
-                        ),
-                }
-            ),
+            data_schema=_BATTERIES_SCHEMA,
         )
 
     async def async_step_battery_config(
@@ -148,14 +401,14 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
             battery_version = user_input.get(CONF_BATTERY_VERSION, DEFAULT_VERSION)
 
             # Test connection before saving
-            connection_result = await self._test_connection(
+            connection_error = await self._test_connection(
                 user_input[CONF_HOST],
                 user_input[CONF_PORT],
                 battery_version
             )
 
-            if not connection_result:
-                errors["base"] = "cannot_connect"
+            if connection_error:
+                errors["base"] = connection_error
             else:
                 # Store version
                 user_input[CONF_BATTERY_VERSION] = battery_version
@@ -168,54 +421,16 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
         if not errors and self.battery_index >= self.config_data["num_batteries"]:
             # All batteries configured, move to time slots configuration
             self.config_data["batteries"] = self.battery_configs
+            # No more probes after this point; free the batteries for setup
+            await _close_probe_clients(self._probe_clients)
             return await self.async_step_time_slots()
 
         # Show form for the next battery
         battery_num = self.battery_index + 1
         return self.async_show_form(
             step_id="battery_config",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(CONF_NAME, default=f"Marstek Venus {battery_num}"):
-                        str,
-                    vol.Required(CONF_HOST): str,
-                    vol.Required(CONF_PORT, default=502): int,
-                    vol.Required(CONF_BATTERY_VERSION, default=DEFAULT_VERSION):
-                        SelectSelector(SelectSelectorConfig(
-                            options=[
-                                {"value": "v2", "label": "v1/v2"},
-                                {"value": "v3", "label": "v3"},
-                            ],
-                            mode=SelectSelectorMode.DROPDOWN,
-                        )),
-                    vol.Required("max_charge_power", default="2500"):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=[
-                                    {"value": "800", "label": "800W"},
-                                    {"value": "2500", "label": "2500W"},
-                                ],
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("max_discharge_power", default="2500"):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=[
-                                    {"value": "800", "label": "800W"},
-                                    {"value": "2500", "label": "2500W"},
-                                ],
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("max_soc", default=100):
-                        NumberSelector(NumberSelectorConfig(min=80, max=100, step=1, mode=NumberSelectorMode.SLIDER)),
-                    vol.Required("min_soc", default=12):
-                        NumberSelector(NumberSelectorConfig(min=12, max=30, step=1, mode=NumberSelectorMode.SLIDER)),
-                    vol.Required("enable_charge_hysteresis", default=False): bool,
-                    vol.Optional("charge_hysteresis_percent", default=5):
-                        NumberSelector(NumberSelectorConfig(min=5, max=20, step=1, mode=NumberSelectorMode.SLIDER)),
-                }
+            data_schema=_battery_config_schema(
+                {**_NEW_BATTERY_DEFAULTS, CONF_NAME: f"Marstek Venus {battery_num}"}
             ),
             errors=errors,
             description_placeholders={"battery_num": str(battery_num)},
@@ -235,11 +450,7 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="time_slots",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_time_slots", default=False): bool,
-                }
-            ),
+            data_schema=_TIME_SLOTS_SCHEMA,
             description_placeholders={
                 "description": "Configure time slots where batteries will NOT discharge (but can charge)"
             },
@@ -258,70 +469,28 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
                 "apply_to_charge": user_input.get("apply_to_charge", False),
             }
             self.time_slots.append(time_slot)
-            
-            # Check if user wants to add more slots (max 4)
-            if len(self.time_slots) < 4:
-                return await self.async_step_add_more_slots()
-            else:
-                # Max slots reached, move to excluded devices
-                self.config_data["no_discharge_time_slots"] = self.time_slots
-                return await self.async_step_excluded_devices()
+
+            # The fourth slot's form has no add_more field, which caps the list at 4
+            if user_input.get("add_more", False):
+                return await self.async_step_add_time_slot()
+            # User finished adding slots, move to excluded devices
+            self.config_data["no_discharge_time_slots"] = self.time_slots
+            return await self.async_step_excluded_devices()
 
         slot_num = len(self.time_slots) + 1
         return self.async_show_form(
             step_id="add_time_slot",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("start_time"): TimeSelector(),
-                    vol.Required("end_time"): TimeSelector(),
-                    vol.Required("days", default=["mon", "tue", "wed", "thu", "fri", "sat", "sun"]):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                                translation_key="weekday",
-                                multiple=True,
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("apply_to_charge", default=False): bool,
-                }
-            ),
+            data_schema=_ADD_TIME_SLOT_SCHEMA if slot_num < 4 else _LAST_TIME_SLOT_SCHEMA,
             description_placeholders={
                 "slot_num": str(slot_num),
                 "description": f"Configure time slot {slot_num} (no discharge period)"
             },
         )
 
-    async def async_step_add_more_slots(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Step 6: Ask if user wants to add more time slots."""
-        if user_input is not None:
-            if user_input.get("add_more", False):
-                return await self.async_step_add_time_slot()
-            else:
-                # User finished adding slots, move to excluded devices
-                self.config_data["no_discharge_time_slots"] = self.time_slots
-                return await self.async_step_excluded_devices()
-
-        return self.async_show_form(
-            step_id="add_more_slots",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("add_more", default=False): bool,
-                }
-            ),
-            description_placeholders={
-                "current_slots": str(len(self.time_slots)),
-                "max_slots": "4",
-                "description": f"You have configured {len(self.time_slots)} time slot(s). Add another?"
-            },
-        )
-
     async def async_step_excluded_devices(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Step 7: Ask if user wants to configure excluded devices."""
+        """Step 6: Ask if user wants to configure excluded devices."""
         if user_input is not None:
             if user_input.get("configure_excluded_devices", False):
                 return await self.async_step_add_excluded_device()
@@ -332,11 +501,7 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="excluded_devices",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_excluded_devices", default=False): bool,
-                }
-            ),
+            data_schema=_EXCLUDED_DEVICES_SCHEMA,
             description_placeholders={
                 "description": "Configure devices that should NOT be powered by battery"
             },
@@ -345,7 +510,7 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
     async def async_step_add_excluded_device(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Step 8: Add an excluded device configuration."""
+        """Step 7: Add an excluded device configuration."""
         if user_input is not None:
             # Save the excluded device
             excluded_device = {
@@ -353,204 +518,75 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
                 "included_in_consumption": user_input.get("included_in_consumption", True),
             }
             self.excluded_devices.append(excluded_device)
-            
-            # Check if user wants to add more devices (max 4)
-            if len(self.excluded_devices) < 4:
-                return await self.async_step_add_more_excluded_devices()
-            else:
-                # Max devices reached, move to predictive charging
-                self.config_data["excluded_devices"] = self.excluded_devices
-                return await self.async_step_predictive_charging()
+
+            # The fourth device's form has no add_more field, which caps the list at 4
+            if user_input.get("add_more", False):
+                return await self.async_step_add_excluded_device()
+            # User finished adding devices, move to predictive charging
+            self.config_data["excluded_devices"] = self.excluded_devices
+            return await self.async_step_predictive_charging()
 
         device_num = len(self.excluded_devices) + 1
         return self.async_show_form(
             step_id="add_excluded_device",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("power_sensor"):
-                        EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required("included_in_consumption", default=True): bool,
-                }
-            ),
+            data_schema=_ADD_EXCLUDED_DEVICE_SCHEMA if device_num < 4 else _LAST_EXCLUDED_DEVICE_SCHEMA,
             description_placeholders={
                 "device_num": str(device_num),
                 "description": f"Configure excluded device {device_num}"
             },
         )
 
-    async def async_step_add_more_excluded_devices(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Step 9: Ask if user wants to add more excluded devices."""
-        if user_input is not None:
-            if user_input.get("add_more", False):
-                return await self.async_step_add_excluded_device()
-            else:
-                # User finished adding devices, move to predictive charging
-                self.config_data["excluded_devices"] = self.excluded_devices
-                return await self.async_step_predictive_charging()
-
-        return self.async_show_form(
-            step_id="add_more_excluded_devices",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("add_more", default=False): bool,
-                }
-            ),
-            description_placeholders={
-                "current_devices": str(len(self.excluded_devices)),
-                "max_devices": "4",
-            },
-        )
-
     async def async_step_predictive_charging(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Step 10: Ask if user wants to configure predictive grid charging."""
+        """Step 8: Enable and configure predictive grid charging."""
+        errors = {}
+
         if user_input is not None:
-            if user_input.get("configure_predictive_charging", False):
-                return await self.async_step_predictive_charging_config()
-            else:
+            if not user_input.get("configure_predictive_charging", False):
                 # Predictive charging disabled
                 self.config_data["enable_predictive_charging"] = False
                 self.config_data["charging_time_slot"] = None
                 self.config_data["solar_forecast_sensor"] = None
                 self.config_data["max_contracted_power"] = 7000
                 return await self.async_step_weekly_full_charge()
-        
-        return self.async_show_form(
-            step_id="predictive_charging",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_predictive_charging", default=False): bool,
+
+            forecast_sensor = user_input.get("solar_forecast_sensor")
+            if error := _forecast_sensor_error(self.hass, forecast_sensor):
+                errors["solar_forecast_sensor"] = error
+            else:
+                # Save predictive charging configuration
+                self.config_data["enable_predictive_charging"] = True
+                self.config_data["charging_time_slot"] = {
+                    "start_time": user_input["start_time"],
+                    "end_time": user_input["end_time"],
+                    "days": user_input["days"],
                 }
-            ),
-        )
+                self.config_data["solar_forecast_sensor"] = forecast_sensor
+                self.config_data["max_contracted_power"] = user_input["max_contracted_power"]
+                return await self.async_step_weekly_full_charge()
 
-    async def async_step_predictive_charging_config(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Step 11: Configure predictive grid charging details."""
-        errors = {}
-        
-        if user_input is not None:
-                # Validate configuration
-                try:
-                    # Check solar forecast sensor exists and has valid unit
-                    forecast_sensor = user_input.get("solar_forecast_sensor")
-                    if forecast_sensor:
-                        forecast_state = self.hass.states.get(forecast_sensor)
-                        if forecast_state is None:
-                            errors["solar_forecast_sensor"] = "sensor_not_found"
-                        else:
-                            unit = forecast_state.attributes.get("unit_of_measurement", "")
-                            if unit not in ["kWh", "Wh"]:
-                                errors["solar_forecast_sensor"] = "invalid_unit"
-
-                    if not errors:
-                        # Save predictive charging configuration
-                        self.config_data["enable_predictive_charging"] = True
-                        self.config_data["charging_time_slot"] = {
-                            "start_time": user_input["start_time"],
-                            "end_time": user_input["end_time"],
-                            "days": user_input["days"],
-                        }
-                        self.config_data["solar_forecast_sensor"] = user_input["solar_forecast_sensor"]
-                        self.config_data["max_contracted_power"] = user_input["max_contracted_power"]
-
-                        return await self.async_step_weekly_full_charge()
-                except Exception as e:
-                    _LOGGER.error("Error validating predictive charging config: %s", e)
-                    errors["base"] = "unknown"
-        
-        # Show form
         return self.async_show_form(
-            step_id="predictive_charging_config",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("start_time"): TimeSelector(),
-                    vol.Required("end_time"): TimeSelector(),
-                    vol.Optional("days", default=["mon", "tue", "wed", "thu", "fri", "sat", "sun"]):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                                translation_key="weekday",
-                                multiple=True,
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("solar_forecast_sensor"):
-                        EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required("max_contracted_power", default=7000):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=1000, max=15000, step=100, mode=NumberSelectorMode.BOX
-                            )
-                        ),
-                }
-            ),
+            step_id="predictive_charging",
+            data_schema=_PREDICTIVE_CHARGING_SCHEMA,
             errors=errors,
         )
 
     async def async_step_weekly_full_charge(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Step 11: Ask if user wants to enable weekly full battery charge."""
+        """Step 9: Enable weekly full battery charge and pick its day."""
         if user_input is not None:
-            if user_input.get("configure_weekly_full_charge", False):
-                return await self.async_step_weekly_full_charge_config()
-            else:
-                # Weekly full charge disabled
-                self.config_data[CONF_ENABLE_WEEKLY_FULL_CHARGE] = False
-                self.config_data[CONF_WEEKLY_FULL_CHARGE_DAY] = "sun"
-                return self.async_create_entry(
-                    title="Marstek Venus Energy Manager", data=self.config_data
-                )
-
-        return self.async_show_form(
-            step_id="weekly_full_charge",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_weekly_full_charge", default=False): bool,
-                }
-            ),
-            description_placeholders={
-                "description": "Enable weekly full battery charge for cell balancing"
-            },
-        )
-
-    async def async_step_weekly_full_charge_config(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Step 12: Configure weekly full charge details."""
-        if user_input is not None:
-            # Save weekly full charge configuration
-            self.config_data[CONF_ENABLE_WEEKLY_FULL_CHARGE] = True
-            self.config_data[CONF_WEEKLY_FULL_CHARGE_DAY] = user_input["weekly_full_charge_day"]
-
+            enabled = user_input.get("configure_weekly_full_charge", False)
+            self.config_data[CONF_ENABLE_WEEKLY_FULL_CHARGE] = enabled
+            self.config_data[CONF_WEEKLY_FULL_CHARGE_DAY] = user_input["weekly_full_charge_day"] if enabled else "sun"
             return self.async_create_entry(
                 title="Marstek Venus Energy Manager", data=self.config_data
             )
 
-        # Show form
         return self.async_show_form(
-            step_id="weekly_full_charge_config",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("weekly_full_charge_day", default="sun"):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                                translation_key="weekday",
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                }
-            ),
-            description_placeholders={
-                "description": "Select the day when batteries should charge to 100% for cell balancing. "
-                              "After reaching 100%, the system reverts to your configured maximum charge limit."
-            },
+            step_id="weekly_full_charge",
+            data_schema=_WEEKLY_FULL_CHARGE_SCHEMA,
         )
 
     @staticmethod
@@ -559,6 +595,18 @@ class MarstekVenusConfigFlow(ConfigFlow, domain=DOMAIN):
         return OptionsFlowHandler(config_entry)
 
 
+def _abort_on_error(step):
+    """Abort the options flow instead of surfacing an unexpected step error."""
+    @functools.wraps(step)
+    async def wrapper(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        try:
+            return await step(self, user_input)
+        except Exception as e:
+            _LOGGER.error("Error in options flow %s: %s", step.__name__, e, exc_info=True)
+            return self.async_abort(reason="unknown_error")
+    return wrapper
+
+
 class OptionsFlowHandler(OptionsFlow):
     def __init__(self, config_entry: ConfigEntry) -> None:
         """Initialize options flow."""
@@ -569,194 +617,111 @@ class OptionsFlowHandler(OptionsFlow):
         self.battery_index = 0
         self.time_slots = []
         self.excluded_devices = []
+        self._probe_clients: dict[tuple[str, int], MarstekModbusClient] = {}
         _LOGGER.info("OptionsFlowHandler initialized successfully for entry: %s", config_entry.entry_id)
 
-    async def _test_connection(self, host: str, port: int, version: str = "v2") -> bool:
-        """Test connection to a Marstek Venus battery using version-specific register."""
-        client = MarstekModbusClient(host, port)
-        try:
-            connected = await client.async_connect()
-            if not connected:
-                return False
-
-            # Test with version-specific SOC register
-            soc_register = REGISTER_MAP.get(version, {}).get("battery_soc")
-            if soc_register is None:
-                await client.async_close()
-                return False
+    @callback
+    def async_remove(self) -> None:
+        """Release probe connections when the flow is abandoned."""
+        if self._probe_clients:
+            self.hass.async_create_task(_close_probe_clients(self._probe_clients))
 
-            value = await client.async_read_register(soc_register, "uint16")
-            await client.async_close()
-            return value is not None
-        except Exception:
-            try:
-                await client.async_close()
-            except Exception:
-                pass
-            return False
+    async def _test_connection(self, host: str, port: int, version: str = "v2") -> str | None:
+        """Test connection to a Marstek Venus battery; returns a form error key on failure."""
+        return await _probe_battery(self.hass, self._probe_clients, host, port, version)
 
+    @_abort_on_error
     async def async_step_init(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Start the options flow - ask for consumption sensor."""
-        try:
-            if user_input is not None:
-                self.config_data["consumption_sensor"] = user_input["consumption_sensor"]
-                return await self.async_step_batteries()
+        if user_input is not None:
+            self.config_data["consumption_sensor"] = user_input["consumption_sensor"]
+            return await self.async_step_batteries()
 
-            # Load current configuration with defensive defaults
-            current_sensor = self.config_entry.data.get("consumption_sensor", "")
-        except Exception as e:
-            _LOGGER.error("Error in options flow init: %s", e, exc_info=True)
-            return self.async_abort(reason="unknown_error")
+        # Load current configuration with defensive defaults
+        current_sensor = self.config_entry.data.get("consumption_sensor", "")
 
         return self.async_show_form(
             step_id="init",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("consumption_sensor", default=current_sensor):
-                        EntitySelector(EntitySelectorConfig(domain="sensor")),
-                }
-            ),
+            data_schema=_consumption_sensor_schema(current_sensor),
         )
 
+    @_abort_on_error
     async def async_step_batteries(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Configure number of batteries."""
-        try:
-            if user_input is not None:
-                self.config_data["num_batteries"] = int(user_input["num_batteries"])
-                return await self.async_step_battery_config()
+        if user_input is not None:
+            self.config_data["num_batteries"] = int(user_input["num_batteries"])
+            return await self.async_step_battery_config()
 
-            # Load current number of batteries with defensive handling
-            batteries = self.config_entry.data.get("batteries", [])
-            current_batteries = len(batteries) if batteries else 1
-        except Exception as e:
-            _LOGGER.error("Error in options flow batteries step: %s", e, exc_info=True)
-            return self.async_abort(reason="unknown_error")
+        # Load current number of batteries with defensive handling
+        batteries = self.config_entry.data.get("batteries", [])
+        current_batteries = len(batteries) if batteries else 1
 
         return self.async_show_form(
             step_id="batteries",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("num_batteries", default=current_batteries):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=1, max=4, mode=NumberSelectorMode.SLIDER
-                            )
-                        ),
-                }
-            ),
+            data_schema=_num_batteries_schema(current_batteries),
         )
 
+    @_abort_on_error
     async def async_step_battery_config(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Configure each battery."""
         errors = {}
 
-        try:
-            if user_input is not None:
-                # Get version for connection test
-                battery_version = user_input.get(CONF_BATTERY_VERSION, DEFAULT_VERSION)
+        if user_input is not None:
+            # Get version for connection test
+            battery_version = user_input.get(CONF_BATTERY_VERSION, DEFAULT_VERSION)
 
-                connection_result = await self._test_connection(
+            # A battery already in the entry with the same connection settings was
+            # validated when it was added; only re-probe when those settings change
+            current_batteries = self.config_entry.data.get("batteries", [])
+            current_battery = (
+                current_batteries[self.battery_index]
+                if self.battery_index < len(current_batteries)
+                else None
+            )
+            if (
+                current_battery is not None
+                and current_battery.get(CONF_HOST) == user_input[CONF_HOST]
+                and current_battery.get(CONF_PORT) == user_input[CONF_PORT]
+                and current_battery.get(CONF_BATTERY_VERSION, DEFAULT_VERSION) == battery_version
+            ):
+                connection_error = None
+            else:
+                connection_error = await self._test_connection(
                     user_input[CONF_HOST],
                     user_input[CONF_PORT],
                     battery_version
                 )
 
-                if not connection_result:
-                    errors["base"] = "cannot_connect"
-                else:
-                    # Store version
-                    user_input[CONF_BATTERY_VERSION] = battery_version
-                    # Convert power values from string to int
-                    user_input["max_charge_power"] = int(user_input["max_charge_power"])
-                    user_input["max_discharge_power"] = int(user_input["max_discharge_power"])
-                    self.battery_configs.append(user_input)
-                    self.battery_index += 1
-
-            # Defensive access to config_data
-            num_batteries = self.config_data.get("num_batteries", 1)
-            if not errors and self.battery_index >= num_batteries:
-                self.config_data["batteries"] = self.battery_configs
-                return await self.async_step_time_slots()
-
-            # Load current battery config if available with defensive handling
-            current_batteries = self.config_entry.data.get("batteries", [])
-        except Exception as e:
-            _LOGGER.error("Error in options flow battery_config step: %s", e, exc_info=True)
-            return self.async_abort(reason="unknown_error")
+            if connection_error:
+                errors["base"] = connection_error
+            else:
+                # Store version
+                user_input[CONF_BATTERY_VERSION] = battery_version
+                # Convert power values from string to int
+                user_input["max_charge_power"] = int(user_input["max_charge_power"])
+                user_input["max_discharge_power"] = int(user_input["max_discharge_power"])
+                self.battery_configs.append(user_input)
+                self.battery_index += 1
+
+        # Defensive access to config_data
+        num_batteries = self.config_data.get("num_batteries", 1)
+        if not errors and self.battery_index >= num_batteries:
+            self.config_data["batteries"] = self.battery_configs
+            await _close_probe_clients(self._probe_clients)
+            return await self.async_step_time_slots()
+
+        # Load current battery config if available with defensive handling
+        current_batteries = self.config_entry.data.get("batteries", [])
         battery_num = self.battery_index + 1
 
+        defaults = {**_NEW_BATTERY_DEFAULTS, CONF_NAME: f"Marstek Venus {battery_num}", CONF_HOST: ""}
         if self.battery_index < len(current_batteries):
             current_battery = current_batteries[self.battery_index]
-            defaults = {
-                CONF_NAME: current_battery.get(CONF_NAME, f"Marstek Venus {battery_num}"),
-                CONF_HOST: current_battery.get(CONF_HOST, ""),
-                CONF_PORT: current_battery.get(CONF_PORT, 502),
-                CONF_BATTERY_VERSION: current_battery.get(CONF_BATTERY_VERSION, DEFAULT_VERSION),
-                "max_charge_power": current_battery.get("max_charge_power", 2500),
-                "max_discharge_power": current_battery.get("max_discharge_power", 2500),
-                "max_soc": current_battery.get("max_soc", 100),
-                "min_soc": current_battery.get("min_soc", 12),
-                "enable_charge_hysteresis": current_battery.get("enable_charge_hysteresis", False),
-                "charge_hysteresis_percent": current_battery.get("charge_hysteresis_percent", 5),
-            }
-        else:
-            defaults = {
-                CONF_NAME: f"Marstek Venus {battery_num}",
-                CONF_HOST: "",
-                CONF_PORT: 502,
-                CONF_BATTERY_VERSION: DEFAULT_VERSION,
-                "max_charge_power": 2500,
-                "max_discharge_power": 2500,
-                "max_soc": 100,
-                "min_soc": 12,
-                "enable_charge_hysteresis": False,
-                "charge_hysteresis_percent": 5,
-            }
+            defaults = {key: current_battery.get(key, value) for key, value in defaults.items()}
 
         return self.async_show_form(
             step_id="battery_config",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(CONF_NAME, default=defaults[CONF_NAME]): str,
-                    vol.Required(CONF_HOST, default=defaults[CONF_HOST]): str,
-                    vol.Required(CONF_PORT, default=defaults[CONF_PORT]): int,
-                    vol.Required(CONF_BATTERY_VERSION, default=defaults[CONF_BATTERY_VERSION]):
-                        SelectSelector(SelectSelectorConfig(
-                            options=[
-                                {"value": "v2", "label": "v1/v2"},
-                                {"value": "v3", "label": "v3"},
-                            ],
-                            mode=SelectSelectorMode.DROPDOWN,
-                        )),
-                    vol.Required("max_charge_power", default=str(defaults["max_charge_power"])):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=[
-                                    {"value": "800", "label": "800W"},
-                                    {"value": "2500", "label": "2500W"},
-                                ],
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("max_discharge_power", default=str(defaults["max_discharge_power"])):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=[
-                                    {"value": "800", "label": "800W"},
-                                    {"value": "2500", "label": "2500W"},
-                                ],
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("max_soc", default=defaults["max_soc"]):
-                        NumberSelector(NumberSelectorConfig(min=80, max=100, step=1, mode=NumberSelectorMode.SLIDER)),
-                    vol.Required("min_soc", default=defaults["min_soc"]):
-                        NumberSelector(NumberSelectorConfig(min=12, max=30, step=1, mode=NumberSelectorMode.SLIDER)),
-                    vol.Required("enable_charge_hysteresis", default=defaults["enable_charge_hysteresis"]): bool,
-                    vol.Optional("charge_hysteresis_percent", default=defaults["charge_hysteresis_percent"]):
-                        NumberSelector(NumberSelectorConfig(min=5, max=20, step=1, mode=NumberSelectorMode.SLIDER)),
-                }
-            ),
+            data_schema=_battery_config_schema(defaults),
             errors=errors,
             description_placeholders={"battery_num": str(battery_num)},
         )
@@ -778,11 +743,7 @@ class OptionsFlowHandler(OptionsFlow):
 
         return self.async_show_form(
             step_id="time_slots",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_time_slots", default=has_existing_slots): bool,
-                }
-            ),
+            data_schema=_toggle_schema("configure_time_slots", has_existing_slots),
         )
 
     async def async_step_add_time_slot(self, user_input: dict[str, Any] | None = None) -> FlowResult:
@@ -795,12 +756,11 @@ class OptionsFlowHandler(OptionsFlow):
                 "apply_to_charge": user_input.get("apply_to_charge", False),
             }
             self.time_slots.append(time_slot)
-            
-            if len(self.time_slots) < 4:
-                return await self.async_step_add_more_slots()
-            else:
-                self.config_data["no_discharge_time_slots"] = self.time_slots
-                return await self.async_step_excluded_devices()
+
+            if user_input.get("add_more", False):
+                return await self.async_step_add_time_slot()
+            self.config_data["no_discharge_time_slots"] = self.time_slots
+            return await self.async_step_excluded_devices()
 
         # Load existing time slots if available and not yet added
         current_slots = self.config_entry.data.get("no_discharge_time_slots", [])
@@ -811,65 +771,25 @@ class OptionsFlowHandler(OptionsFlow):
             defaults = {
                 "start_time": current_slot.get("start_time", "00:00:00"),
                 "end_time": current_slot.get("end_time", "00:00:00"),
-                "days": current_slot.get("days", ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]),
+                "days": current_slot.get("days", _WEEKDAYS),
                 "apply_to_charge": current_slot.get("apply_to_charge", False),
             }
         else:
             defaults = {
                 "start_time": "00:00:00",
                 "end_time": "00:00:00",
-                "days": ["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
                 "apply_to_charge": False,
             }
 
         slot_num += 1
+        # Offer to continue by default while the entry still has slots to walk through
+        add_more = slot_num < len(current_slots) if slot_num < 4 else None
         return self.async_show_form(
             step_id="add_time_slot",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("start_time", default=defaults["start_time"]): TimeSelector(),
-                    vol.Required("end_time", default=defaults["end_time"]): TimeSelector(),
-                    vol.Required("days", default=defaults["days"]):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                                translation_key="weekday",
-                                multiple=True,
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("apply_to_charge", default=defaults["apply_to_charge"]): bool,
-                }
-            ),
+            data_schema=_time_slot_schema(defaults, add_more),
             description_placeholders={"slot_num": str(slot_num)},
         )
 
-    async def async_step_add_more_slots(self, user_input: dict[str, Any] | None = None) -> FlowResult:
-        """Ask if user wants to add more time slots."""
-        if user_input is not None:
-            if user_input.get("add_more", False):
-                return await self.async_step_add_time_slot()
-            else:
-                self.config_data["no_discharge_time_slots"] = self.time_slots
-                return await self.async_step_excluded_devices()
-
-        # Check if there are more existing slots to show
-        existing_slots = self.config_entry.data.get("no_discharge_time_slots", [])
-        has_more_existing = len(self.time_slots) < len(existing_slots)
-
-        return self.async_show_form(
-            step_id="add_more_slots",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("add_more", default=has_more_existing): bool,
-                }
-            ),
-            description_placeholders={
-                "current_slots": str(len(self.time_slots)),
-                "max_slots": "4",
-            },
-        )
-
     async def async_step_excluded_devices(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -890,11 +810,7 @@ class OptionsFlowHandler(OptionsFlow):
 
         return self.async_show_form(
             step_id="excluded_devices",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_excluded_devices", default=has_existing_devices): bool,
-                }
-            ),
+            data_schema=_toggle_schema("configure_excluded_devices", has_existing_devices),
             description_placeholders={
                 "description": "Configure devices with special management"
             },
@@ -911,254 +827,100 @@ class OptionsFlowHandler(OptionsFlow):
                 "included_in_consumption": user_input.get("included_in_consumption", True),
             }
             self.excluded_devices.append(excluded_device)
-            
-            # Check if user wants to add more devices (max 4)
-            if len(self.excluded_devices) < 4:
-                return await self.async_step_add_more_excluded_devices()
-            else:
-                # Max devices reached, move to predictive charging
-                self.config_data["excluded_devices"] = self.excluded_devices
-                return await self.async_step_predictive_charging()
+
+            if user_input.get("add_more", False):
+                return await self.async_step_add_excluded_device()
+            # User finished adding devices, move to predictive charging
+            self.config_data["excluded_devices"] = self.excluded_devices
+            return await self.async_step_predictive_charging()
 
         # Load existing excluded devices if available and not yet added
         current_devices = self.config_entry.data.get("excluded_devices", [])
         device_num = len(self.excluded_devices)
         
+        defaults = {"power_sensor": "", "included_in_consumption": True}
         if device_num < len(current_devices):
             current_device = current_devices[device_num]
-            default_sensor = current_device.get("power_sensor", "")
-            default_included = current_device.get("included_in_consumption", True)
-        else:
-            default_sensor = ""
-            default_included = True
+            defaults = {key: current_device.get(key, value) for key, value in defaults.items()}
         
         device_num += 1
+        add_more = device_num < len(current_devices) if device_num < 4 else None
         return self.async_show_form(
             step_id="add_excluded_device",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("power_sensor", default=default_sensor):
-                        EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required("included_in_consumption", default=default_included): bool,
-                }
-            ),
+            data_schema=_excluded_device_schema(defaults, add_more),
             description_placeholders={
                 "device_num": str(device_num),
                 "description": f"Configure special device {device_num}"
             },
         )
 
-    async def async_step_add_more_excluded_devices(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Ask if user wants to add more excluded devices."""
-        if user_input is not None:
-            if user_input.get("add_more", False):
-                return await self.async_step_add_excluded_device()
-            else:
-                # User finished adding devices, move to predictive charging
-                self.config_data["excluded_devices"] = self.excluded_devices
-                return await self.async_step_predictive_charging()
-
-        # Check if there are more existing devices to show
-        existing_devices = self.config_entry.data.get("excluded_devices", [])
-        has_more_existing = len(self.excluded_devices) < len(existing_devices)
-
-        return self.async_show_form(
-            step_id="add_more_excluded_devices",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("add_more", default=has_more_existing): bool,
-                }
-            ),
-            description_placeholders={
-                "current_devices": str(len(self.excluded_devices)),
-                "max_devices": "4",
-            },
-        )
-
     async def async_step_predictive_charging(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Ask if user wants to configure predictive grid charging in options flow."""
+        """Enable and configure predictive grid charging in options flow."""
+        errors = {}
+
         if user_input is not None:
-            if user_input.get("configure_predictive_charging", False):
-                return await self.async_step_predictive_charging_config()
-            else:
+            if not user_input.get("configure_predictive_charging", False):
                 # Predictive charging disabled
                 self.config_data["enable_predictive_charging"] = False
                 self.config_data["charging_time_slot"] = None
                 self.config_data["solar_forecast_sensor"] = None
                 self.config_data["max_contracted_power"] = 7000
-
                 return await self.async_step_weekly_full_charge()
 
-        # Check if predictive charging was previously enabled
-        is_predictive_enabled = self.config_entry.data.get("enable_predictive_charging", False)
-
-        return self.async_show_form(
-            step_id="predictive_charging",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_predictive_charging", default=is_predictive_enabled): bool,
+            forecast_sensor = user_input.get("solar_forecast_sensor")
+            if error := _forecast_sensor_error(self.hass, forecast_sensor):
+                errors["solar_forecast_sensor"] = error
+            else:
+                # Save predictive charging configuration
+                self.config_data["enable_predictive_charging"] = True
+                self.config_data["charging_time_slot"] = {
+                    "start_time": user_input["start_time"],
+                    "end_time": user_input["end_time"],
+                    "days": user_input["days"],
                 }
-            ),
-        )
+                self.config_data["solar_forecast_sensor"] = forecast_sensor
+                self.config_data["max_contracted_power"] = user_input["max_contracted_power"]
+                return await self.async_step_weekly_full_charge()
 
-    async def async_step_predictive_charging_config(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Configure predictive grid charging details in options flow."""
-        errors = {}
-        
-        # Load existing configuration
+        # Prefill from the existing configuration
         existing_config = self.config_entry.data
-        time_slot_current = existing_config.get("charging_time_slot", {})
-        forecast_sensor_current = existing_config.get("solar_forecast_sensor", "")
-        max_power_current = existing_config.get("max_contracted_power", 7000)
-        
-        if user_input is not None:
-                # Validate configuration
-                try:
-                    # Check solar forecast sensor exists and has valid unit
-                    forecast_sensor = user_input.get("solar_forecast_sensor")
-                    if forecast_sensor:
-                        forecast_state = self.hass.states.get(forecast_sensor)
-                        if forecast_state is None:
-                            errors["solar_forecast_sensor"] = "sensor_not_found"
-                        else:
-                            unit = forecast_state.attributes.get("unit_of_measurement", "")
-                            if unit not in ["kWh", "Wh"]:
-                                errors["solar_forecast_sensor"] = "invalid_unit"
-
-                    if not errors:
-                        # Save predictive charging configuration
-                        self.config_data["enable_predictive_charging"] = True
-                        self.config_data["charging_time_slot"] = {
-                            "start_time": user_input["start_time"],
-                            "end_time": user_input["end_time"],
-                            "days": user_input["days"],
-                        }
-                        self.config_data["solar_forecast_sensor"] = user_input["solar_forecast_sensor"]
-                        self.config_data["max_contracted_power"] = user_input["max_contracted_power"]
-
-                        return await self.async_step_weekly_full_charge()
-                except Exception as e:
-                    _LOGGER.error("Error validating predictive charging config: %s", e)
-                    errors["base"] = "unknown"
-        
-        # Prepare defaults from existing config
-        if time_slot_current:
-            defaults = {
-                "start_time": time_slot_current.get("start_time", "01:00:00"),
-                "end_time": time_slot_current.get("end_time", "06:00:00"),
-                "days": time_slot_current.get("days", ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]),
-                "sensor": forecast_sensor_current if forecast_sensor_current else "",
-                "power": max_power_current,
-            }
-        else:
-            defaults = {
-                "start_time": "01:00:00",
-                "end_time": "06:00:00",
-                "days": ["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                "sensor": "",
-                "power": 7000,
-            }
-        
-        # Show form
+        time_slot_current = existing_config.get("charging_time_slot") or {}
+        defaults = {
+            "enabled": existing_config.get("enable_predictive_charging", False),
+            "start_time": time_slot_current.get("start_time", "01:00:00"),
+            "end_time": time_slot_current.get("end_time", "06:00:00"),
+            "days": time_slot_current.get("days", _WEEKDAYS),
+            "solar_forecast_sensor": existing_config.get("solar_forecast_sensor"),
+            "max_contracted_power": existing_config.get("max_contracted_power") or 7000,
+        }
+
         return self.async_show_form(
-            step_id="predictive_charging_config",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("start_time", default=defaults["start_time"]): TimeSelector(),
-                    vol.Required("end_time", default=defaults["end_time"]): TimeSelector(),
-                    vol.Required("days", default=defaults["days"]):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                                translation_key="weekday",
-                                multiple=True,
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                    vol.Required("solar_forecast_sensor", default=defaults["sensor"]):
-                        EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required("max_contracted_power", default=defaults["power"]):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=1000, max=15000, step=100, mode=NumberSelectorMode.BOX
-                            )
-                        ),
-                }
-            ),
+            step_id="predictive_charging",
+            data_schema=_predictive_charging_schema(defaults),
             errors=errors,
         )
 
     async def async_step_weekly_full_charge(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Ask if user wants to enable weekly full battery charge in options flow."""
+        """Enable weekly full battery charge and pick its day in options flow."""
         if user_input is not None:
-            if user_input.get("configure_weekly_full_charge", False):
-                return await self.async_step_weekly_full_charge_config()
-            else:
-                # Weekly full charge disabled
-                self.config_data[CONF_ENABLE_WEEKLY_FULL_CHARGE] = False
-                self.config_data[CONF_WEEKLY_FULL_CHARGE_DAY] = "sun"
-
-                # Continue to PD controller advanced settings
-                return await self.async_step_pd_advanced()
-
-        # Check if weekly full charge was previously enabled
-        is_weekly_full_charge_enabled = self.config_entry.data.get(CONF_ENABLE_WEEKLY_FULL_CHARGE, False)
-
-        return self.async_show_form(
-            step_id="weekly_full_charge",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_weekly_full_charge", default=is_weekly_full_charge_enabled): bool,
-                }
-            ),
-            description_placeholders={
-                "description": "Enable weekly full battery charge for cell balancing"
-            },
-        )
-
-    async def async_step_weekly_full_charge_config(
-        self, user_input: dict[str, Any] | None = None
-    ) -> FlowResult:
-        """Configure weekly full charge details in options flow."""
-        # Load existing configuration
-        existing_config = self.config_entry.data
-        current_day = existing_config.get(CONF_WEEKLY_FULL_CHARGE_DAY, "sun")
-
-        if user_input is not None:
-            # Save weekly full charge configuration
-            self.config_data[CONF_ENABLE_WEEKLY_FULL_CHARGE] = True
-            self.config_data[CONF_WEEKLY_FULL_CHARGE_DAY] = user_input["weekly_full_charge_day"]
+            enabled = user_input.get("configure_weekly_full_charge", False)
+            self.config_data[CONF_ENABLE_WEEKLY_FULL_CHARGE] = enabled
+            self.config_data[CONF_WEEKLY_FULL_CHARGE_DAY] = user_input["weekly_full_charge_day"] if enabled else "sun"
 
             # Continue to PD controller advanced settings
             return await self.async_step_pd_advanced()
 
-        # Show form
+        existing_config = self.config_entry.data
         return self.async_show_form(
-            step_id="weekly_full_charge_config",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("weekly_full_charge_day", default=current_day):
-                        SelectSelector(
-                            SelectSelectorConfig(
-                                options=["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-                                translation_key="weekday",
-                                mode=SelectSelectorMode.DROPDOWN,
-                            )
-                        ),
-                }
+            step_id="weekly_full_charge",
+            data_schema=_weekly_full_charge_schema(
+                existing_config.get(CONF_ENABLE_WEEKLY_FULL_CHARGE, False),
+                existing_config.get(CONF_WEEKLY_FULL_CHARGE_DAY, "sun"),
             ),
-            description_placeholders={
-                "description": "Select the day when batteries should charge to 100% for cell balancing. "
-                              "After reaching 100%, the system reverts to your configured maximum charge limit."
-            },
         )
 
     async def async_step_pd_advanced(
@@ -1194,11 +956,7 @@ class OptionsFlowHandler(OptionsFlow):
 
         return self.async_show_form(
             step_id="pd_advanced",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("configure_pd_advanced", default=has_custom_pd): bool,
-                }
-            ),
+            data_schema=_toggle_schema("configure_pd_advanced", has_custom_pd),
             description_placeholders={
                 "description": "Configure advanced PD controller parameters for expert tuning of battery charge/discharge behavior. "
                               "Only modify these if you understand PID control theory. Default values work well for most installations."
@@ -1237,45 +995,13 @@ class OptionsFlowHandler(OptionsFlow):
             step_id="pd_advanced_config",
             data_schema=vol.Schema(
                 {
-                    vol.Required("pd_kp", default=current_kp):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=0.1, max=2.0, step=0.05, mode=NumberSelectorMode.BOX
-                            )
-                        ),
-                    vol.Required("pd_kd", default=current_kd):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=0.0, max=2.0, step=0.05, mode=NumberSelectorMode.BOX
-                            )
-                        ),
-                    vol.Required("pd_deadband", default=current_deadband):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=0, max=200, step=5, mode=NumberSelectorMode.SLIDER
-                            )
-                        ),
+                    vol.Required("pd_kp", default=current_kp): _PD_KP_SELECTOR,
+                    vol.Required("pd_kd", default=current_kd): _PD_KD_SELECTOR,
+                    vol.Required("pd_deadband", default=current_deadband): _PD_DEADBAND_SELECTOR,
                     vol.Required("pd_max_power_change", default=current_max_change):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=100, max=2000, step=50, mode=NumberSelectorMode.SLIDER
-                            )
-                        ),
+                        _PD_MAX_POWER_CHANGE_SELECTOR,
                     vol.Required("pd_direction_hysteresis", default=current_hysteresis):
-                        NumberSelector(
-                            NumberSelectorConfig(
-                                min=0, max=200, step=5, mode=NumberSelectorMode.SLIDER
-                            )
-                        ),
+                        _PD_DIRECTION_HYSTERESIS_SELECTOR,
                 }
             ),
-            description_placeholders={
-                "description": (
-                    "**Kp (Proportional Gain)**: Responsiveness to grid imbalance. Higher = faster response but risk of overshoot.\n\n"
-                    "**Kd (Derivative Gain)**: Damping to prevent oscillation. Higher = smoother transitions but slower settling.\n\n"
-                    "**Deadband**: Grid power tolerance (W) around zero. Prevents micro-adjustments to minor fluctuations.\n\n"
-                    "**Max Power Change**: Maximum battery power change per control cycle (W). Prevents abrupt battery commands.\n\n"
-                    "**Direction Hysteresis**: Power threshold (W) required to switch between charging and discharging. Prevents rapid direction changes."
-                )
-            },
         )
\ No newline at end of file
@@ -853,6 +853,7 @@ CONF_MAX_CONTRACTED_POWER = "max_contracted_power"
 
 # Default base consumption fallback (kWh/day)
 DEFAULT_BASE_CONSUMPTION_KWH = 5.0  # Fallback when no consumption history available
+CONSUMPTION_HISTORY_SAVE_DELAY = 5  # Seconds to coalesce consumption history writes
 
 # Re-evaluation thresholds
 SOC_REEVALUATION_THRESHOLD = 30  # Re-evaluate every 30% SOC drop
@@ -880,3 +881,13 @@ DEFAULT_PD_KD = 0.5
 DEFAULT_PD_DEADBAND = 40
 DEFAULT_PD_MAX_POWER_CHANGE = 800
 DEFAULT_PD_DIRECTION_HYSTERESIS = 60
+
+# Samples in the grid sensor moving average (small, so a deque with a running sum is enough)
+SENSOR_FILTER_SIZE = 2
+
+# Seconds between ticks that refresh the coordinators and then run the control loop
+CONTROL_INTERVAL = 1.5
+
+# Cycle length the per-cycle PD settings (max power change, integral decay) were tuned for;
+# the controller rescales them to CONTROL_INTERVAL so the ramp rate in W/s stays the same
+PD_TUNING_INTERVAL = 2.0
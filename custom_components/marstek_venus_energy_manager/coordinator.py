@@ -6,6 +6,7 @@ from datetime import timedelta, datetime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers import entity_registry
+from homeassistant.util.dt import utcnow
 
 from .const import (
     DOMAIN, 
@@ -15,11 +16,36 @@ from .const import (
     SELECT_DEFINITIONS,
     SWITCH_DEFINITIONS,
     BINARY_SENSOR_DEFINITIONS,
+    EFFICIENCY_SENSOR_DEFINITIONS,
+    STORED_ENERGY_SENSOR_DEFINITIONS,
+    REGISTER_MAP,
 )
-from .modbus_client import MarstekModbusClient
+from .modbus_client import ILLEGAL_FUNCTION, MarstekModbusClient
 
 _LOGGER = logging.getLogger(__name__)
 
+# Keys the calculated sensors depend on; always polled, even if their own entity is disabled
+_DEPENDENCY_KEYS = frozenset(
+    dep_key
+    for defn in EFFICIENCY_SENSOR_DEFINITIONS + STORED_ENERGY_SENSOR_DEFINITIONS
+    for dep_key in defn.get("dependency_keys", {}).values()
+    if dep_key
+)
+
+# Entity type for each definition key; when a key appears in several definition
+# lists, the last type in this tuple wins (sensor, then number, select, ...)
+_ENTITY_TYPES = {
+    definition["key"]: entity_type
+    for entity_type, definitions in (
+        ("binary_sensor", BINARY_SENSOR_DEFINITIONS),
+        ("switch", SWITCH_DEFINITIONS),
+        ("select", SELECT_DEFINITIONS),
+        ("number", NUMBER_DEFINITIONS),
+        ("sensor", SENSOR_DEFINITIONS),
+    )
+    for definition in definitions
+}
+
 
 class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
     """Manages polling for data from a single Marstek Venus battery."""
@@ -62,6 +88,11 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
         self._scan_counter = 0
         self.lock = asyncio.Lock()
         self._is_shutting_down = False  # Flag to suppress errors during shutdown
+        self._block_writes_supported = True  # Cleared if the battery rejects multi-register writes
+
+        # Latest values of the fields the controller reads every cycle, mirrored from data
+        self.battery_soc = 0
+        self.daily_discharging_energy = 0
 
         # Timestamp-based update tracking
         self._last_update_times = {}
@@ -123,8 +154,6 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
         Returns:
             Register address or None if not available for this version
         """
-        from .const import REGISTER_MAP
-
         register = REGISTER_MAP.get(self.battery_version, {}).get(key)
         if register is None:
             _LOGGER.debug(
@@ -138,9 +167,6 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
 
         Sensors disabled in Home Assistant are skipped, except dependencies which are always fetched.
         """
-        from homeassistant.util.dt import utcnow
-        from homeassistant.helpers import entity_registry as er
-
         now = utcnow()
         updated_data = {}
 
@@ -148,14 +174,7 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
 
         # Get the entity registry to check for disabled entities
         if self._entity_registry is None:
-            self._entity_registry = er.async_get(self.hass)
-
-        # Collect all dependency keys from calculated sensors
-        from .const import EFFICIENCY_SENSOR_DEFINITIONS, STORED_ENERGY_SENSOR_DEFINITIONS
-        all_definitions_for_deps = EFFICIENCY_SENSOR_DEFINITIONS + STORED_ENERGY_SENSOR_DEFINITIONS
-        dependency_keys_set = {dep_key for defn in all_definitions_for_deps
-                            for dep_key in defn.get("dependency_keys", {}).values()
-                            if dep_key}
+            self._entity_registry = entity_registry.async_get(self.hass)
 
         # Set client unit ID for this battery
         self.client.unit_id = 1
@@ -187,7 +206,7 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
                 is_disabled = entry.disabled or entry.disabled_by is not None
 
             # Check if this key is a dependency key for any calculated sensor
-            is_dependency = key in dependency_keys_set
+            is_dependency = key in _DEPENDENCY_KEYS
 
             # Skip polling if entity is disabled unless it is a dependency key
             if is_disabled:
@@ -264,6 +283,10 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
 
         # Update the coordinator's data
         self.data.update(updated_data)
+        if "battery_soc" in updated_data:
+            self.battery_soc = updated_data["battery_soc"]
+        if "total_daily_discharging_energy" in updated_data:
+            self.daily_discharging_energy = updated_data["total_daily_discharging_energy"]
         
         # Log updates for debugging
         if updated_data:
@@ -273,22 +296,8 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
 
     def _get_entity_type(self, sensor_definition: dict) -> str:
         """Determine entity type based on sensor definition."""
-        key = sensor_definition["key"]
-        
-        # Check which definition list this sensor belongs to by key
-        if key in [s["key"] for s in SENSOR_DEFINITIONS]:
-            return "sensor"
-        elif key in [s["key"] for s in NUMBER_DEFINITIONS]:
-            return "number"
-        elif key in [s["key"] for s in SELECT_DEFINITIONS]:
-            return "select"
-        elif key in [s["key"] for s in SWITCH_DEFINITIONS]:
-            return "switch"
-        elif key in [s["key"] for s in BINARY_SENSOR_DEFINITIONS]:
-            return "binary_sensor"
-        else:
-            # Default to sensor if not found
-            return "sensor"
+        # Default to sensor if the key isn't in any definition list
+        return _ENTITY_TYPES.get(sensor_definition["key"], "sensor")
 
     async def write_register(self, register: int, value: int, do_refresh: bool = True):
         """Write a value to a register and optionally do an immediate refresh."""
@@ -320,6 +329,42 @@ class MarstekVenusDataUpdateCoordinator(DataUpdateCoordinator):
         if do_refresh:
             await self.async_request_refresh()
 
+    async def write_registers(self, register: int, values: list[int]) -> bool:
+        """Write consecutive registers, in one request when the battery supports it.
+
+        Falls back to one write per register (and stays on that path) only if the
+        battery answers the multi-register write with ILLEGAL_FUNCTION. Any other
+        exception response, or no answer at all, is an ordinary failed write.
+        """
+        if self._block_writes_supported:
+            result = None
+            async with self.lock:
+                self.client.unit_id = 1
+                try:
+                    result = await self.client.async_write_registers(register, values)
+                except Exception as e:
+                    if not self._is_shutting_down:
+                        _LOGGER.error("[%s] Exception writing registers %d-%d: %s",
+                                      self.name, register, register + len(values) - 1, e)
+            if result == 0:
+                return True
+            if self._is_shutting_down:
+                return False
+            if result != ILLEGAL_FUNCTION:
+                if result is not None:
+                    _LOGGER.error("[%s] Battery rejected write to registers %d-%d (exception code %d)",
+                                  self.name, register, register + len(values) - 1, result)
+                return False
+            self._block_writes_supported = False
+            _LOGGER.info("[%s] Multi-register write rejected, using single register writes", self.name)
+
+        for offset, value in enumerate(values):
+            if offset:
+                await asyncio.sleep(0.05)
+            if not await self.write_register(register + offset, value, do_refresh=False):
+                return False
+        return True
+
     async def async_read_power_feedback(self) -> dict | None:
         """Read power-related registers for immediate feedback after control loop write.
 
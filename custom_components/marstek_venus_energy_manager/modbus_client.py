@@ -12,6 +12,9 @@ import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+# Modbus exception code for a function code the device does not implement
+ILLEGAL_FUNCTION = 0x01
+
 
 class MarstekModbusClient:
     """
@@ -322,3 +325,55 @@ class MarstekModbusClient:
                 max_retries,
             )
         return False
+
+    async def async_write_registers(
+        self, register: int, values: list[int], max_retries: int = 3, retry_delay: float = 0.1
+    ) -> Optional[int]:
+        """
+        Write consecutive Modbus holding registers in a single request (function code 0x10).
+
+        Args:
+            register (int): Address of the first register to write.
+            values (list[int]): Values to write, one per register.
+
+        Returns:
+            Optional[int]: 0 if the write succeeded, the Modbus exception code if the
+            device answered with an exception response (e.g. ILLEGAL_FUNCTION), None
+            if no answer was received after all retries.
+        """
+        attempt = 0
+        current_retry_delay = retry_delay
+
+        while attempt < max_retries:
+            try:
+                _LOGGER.debug("Writing values %s to registers %d-%d", values, register, register + len(values) - 1)
+                result = await self.client.write_registers(
+                    address=register, values=values
+                )
+                if not result.isError():
+                    return 0
+                exception_code = getattr(result, "exception_code", None)
+                if exception_code is not None:
+                    return exception_code
+                _LOGGER.debug("No valid response writing registers %d-%d on attempt %d: %s",
+                              register, register + len(values) - 1, attempt + 1, result)
+
+            except Exception as e:
+                _LOGGER.exception("Exception during modbus write at registers %d-%d on attempt %d: %s",
+                                  register, register + len(values) - 1, attempt + 1, e)
+
+            attempt += 1
+            if attempt < max_retries:
+                # Exponential backoff with jitter
+                jitter = current_retry_delay * 0.1 * (0.5 - asyncio.get_event_loop().time() % 1)
+                await asyncio.sleep(current_retry_delay + jitter)
+                current_retry_delay = min(current_retry_delay * 2, 5.0)  # Cap at 5 seconds
+
+        if not self._is_shutting_down:
+            _LOGGER.error(
+                "Failed to write registers %d-%d after %d attempts",
+                register,
+                register + len(values) - 1,
+                max_retries,
+            )
+        return None
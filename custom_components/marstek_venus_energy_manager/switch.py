@@ -222,6 +222,8 @@ class ManualModeSwitch(SwitchEntity):
         self.controller.error_integral = 0.0
         self.controller.previous_error = 0.0
         self.controller.sign_changes = 0
+        # Batteries may have been set by hand; make the next idle command reach them
+        self.controller._idle_confirmed_at = None
 
         _LOGGER.info("Manual Mode DISABLED - resuming automatic control")
 